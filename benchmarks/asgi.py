@@ -0,0 +1,227 @@
+"""Запросов в секунду через WSGI и через ASGI-обработчик.
+
+WSGI: каждый одновременный клиент - свой поток, как у потокового
+сервера. ASGI: клиенты - корутины одного цикла событий, view
+выполняются в пуле core.asgi.ASGIHandler из --threads потоков.
+Страницы - главная, группа, профиль, пост и лента подписок.
+Результат - JSON:
+
+    python benchmarks/asgi.py --clients 1 8 32 --threads 8
+
+Кеш страниц отключён, чтобы замер шёл через view и базу.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--clients', type=int, nargs='+',
+                        default=[1, 8, 32])
+    parser.add_argument('--threads', type=int, default=8,
+                        help='потоков пула ASGI')
+    parser.add_argument('--duration', type=float, default=5,
+                        help='секунд на один прогон')
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--database',
+                        default=os.path.join(BASE_DIR, 'benchmarks',
+                                             'asgi.sqlite3'))
+    parser.add_argument('--output', default='-',
+                        help='файл для JSON, по умолчанию stdout')
+    return parser.parse_args()
+
+
+def seed(count):
+    from django.contrib.auth import get_user_model
+    from posts import dataset
+    from posts.models import Comment, Follow, Group, Post
+
+    User = get_user_model()
+    author = User.objects.create_user(username='author')
+    reader = User.objects.create_user(username='reader')
+    group = Group.objects.create(title='Группа', slug='group',
+                                 description='Описание')
+    Follow.objects.create(user=reader, author=author)
+    Post.objects.bulk_create(
+        Post(text=f'Пост {i}', author=author, group=group)
+        for i in range(count)
+    )
+    Comment.objects.bulk_create(
+        Comment(post_id=post_id, author=reader, text='Комментарий')
+        for post_id in Post.objects.values_list('id', flat=True)[:50]
+    )
+    dataset.rebuild_derived()
+    return reader
+
+
+def pages():
+    from django.urls import reverse
+    from posts.models import Post
+
+    post_ids = Post.objects.values_list('id', flat=True)[:20]
+    return [
+        reverse('posts:index'),
+        reverse('posts:group_list', args=['group']),
+        reverse('posts:profile', args=['author']),
+        reverse('posts:follow_index'),
+    ] + [reverse('posts:post_detail', args=[post_id])
+         for post_id in post_ids]
+
+
+def summary(clients, latencies, errors, duration):
+    latencies.sort()
+    return {
+        'clients': clients,
+        'requests_per_second': round(len(latencies) / duration, 1),
+        'errors': errors,
+        'p50_ms': percentile_ms(latencies, 50),
+        'p99_ms': percentile_ms(latencies, 99),
+    }
+
+
+def percentile_ms(values, percent):
+    if not values:
+        return None
+    return round(values[min(len(values) - 1,
+                            len(values) * percent // 100)] * 1000, 3)
+
+
+def run_wsgi(clients, args, urls, cookie):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.test import RequestFactory
+
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    stop = threading.Event()
+    latencies, errors = [], []
+
+    def client():
+        while not stop.is_set():
+            environ = factory._base_environ(
+                PATH_INFO=random.choice(urls), REQUEST_METHOD='GET',
+                HTTP_COOKIE=cookie,
+            )
+            started = time.perf_counter()
+            response = handler(environ, lambda status, headers: None)
+            b''.join(response)
+            response.close()
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors.append(response.status_code)
+        connections.close_all()
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return summary(clients, latencies, len(errors), args.duration)
+
+
+async def asgi_request(handler, url, cookie):
+    """Один GET через ASGI-обработчик, возвращает статус ответа."""
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await handler({
+        'type': 'http', 'method': 'GET', 'path': url,
+        'query_string': b'', 'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+        'headers': [(b'cookie', cookie.encode())],
+    }, receive, send)
+    return status[0]
+
+
+def run_asgi(clients, args, urls, cookie):
+    from core.asgi import ASGIHandler
+
+    handler = ASGIHandler(max_workers=args.threads)
+    latencies, errors = [], []
+
+    async def client(deadline):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = await asgi_request(handler, random.choice(urls),
+                                        cookie)
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors.append(status)
+
+    async def main():
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(client(deadline) for _ in range(clients)))
+
+    asyncio.run(main())
+    handler.executor.shutdown(wait=True)
+    return summary(clients, latencies, len(errors), args.duration)
+
+
+def main():
+    args = parse_args()
+
+    import django
+    from django.conf import settings
+    settings.DATABASES['default']['TEST'] = {'NAME': args.database}
+    settings.THUMBNAIL_WORKERS = 0
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }}
+    django.setup()
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment(debug=False)
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    reader = seed(args.posts)
+    client = Client()
+    client.force_login(reader)
+    cookie = f"{settings.SESSION_COOKIE_NAME}=" \
+             f"{client.cookies[settings.SESSION_COOKIE_NAME].value}"
+    urls = pages()
+    connection.close()
+
+    report = {'wsgi': [], 'asgi': [], 'asgi_threads': args.threads}
+    for clients in args.clients:
+        for name, run in (('wsgi', run_wsgi), ('asgi', run_asgi)):
+            result = run(clients, args, urls, cookie)
+            report[name].append(result)
+            print(f"{name}: клиентов {clients}, "
+                  f"{result['requests_per_second']} запросов/с, "
+                  f"p99 {result['p99_ms']} мс, ошибок {result['errors']}",
+                  file=sys.stderr)
+    connection.creation.destroy_test_db(args.database, verbosity=0)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(output)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Пропускная способность чтения при одновременной записи в SQLite.
+
+Читатели в потоках запрашивают главную и страницы постов через
+полный стек middleware, писатели тем временем создают посты
+и комментарии. Прогон повторяется для числа читателей из --readers
+в профиле по умолчанию и в production (WAL, прагмы, постоянные
+соединения). Результат - JSON:
+
+    python benchmarks/concurrency.py --readers 1 2 4 8 --output wal.json
+
+Потоки делят один GIL, но SQLite отпускает его на время запроса,
+поэтому блокировки базы видны так же, как между процессами.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+PROFILES = ('default', 'production')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--readers', type=int, nargs='+',
+                        default=[1, 2, 4, 8])
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=5,
+                        help='секунд на один прогон')
+    parser.add_argument('--posts', type=int, default=500,
+                        help='постов в базе перед замером')
+    parser.add_argument('--database',
+                        default=os.path.join(BASE_DIR, 'benchmarks',
+                                             'concurrency.sqlite3'))
+    parser.add_argument('--output', default='-',
+                        help='файл для JSON, по умолчанию stdout')
+    return parser.parse_args()
+
+
+def seed(count):
+    from django.contrib.auth import get_user_model
+    from posts.models import Post
+
+    User = get_user_model()
+    author = User.objects.create_user(username='author')
+    User.objects.create_user(username='reader')
+    Post.objects.bulk_create(
+        Post(text=f'Пост {i}', author=author) for i in range(count)
+    )
+
+
+def use_profile(name):
+    """Переключает профиль: прагмы новых соединений, режим журнала
+    файла и время жизни соединений."""
+    from django.conf import settings
+    from django.db import connection, connections
+
+    connections.close_all()
+    production = name == 'production'
+    settings.SQLITE_PRODUCTION = production
+    connection.settings_dict['CONN_MAX_AGE'] = 600 if production else 0
+    # Режим WAL хранится в файле базы, его надо снимать явно
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode = %s'
+                       % ('WAL' if production else 'DELETE'))
+    connections.close_all()
+
+
+def reader(handler, environ_for, urls, stop, stats):
+    from django.db import connections
+
+    latencies = []
+    errors = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = handler(environ_for(random.choice(urls)),
+                           lambda status, headers: None)
+        b''.join(response)
+        response.close()
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    connections.close_all()
+    stats.append((latencies, errors))
+
+
+def writer(author, post_ids, stop, stats):
+    from django.db import OperationalError, connections
+    from posts.models import Comment, Post
+
+    writes = 0
+    errors = 0
+    while not stop.is_set():
+        try:
+            if random.random() < 0.5:
+                Post.objects.create(text='Новый пост', author=author)
+            else:
+                Comment.objects.create(post_id=random.choice(post_ids),
+                                       author=author, text='Комментарий')
+            writes += 1
+        except OperationalError:
+            # database is locked
+            errors += 1
+    connections.close_all()
+    stats.append((writes, errors))
+
+
+def run(readers, args, handler, environ_for, urls, author, post_ids):
+    stop = threading.Event()
+    read_stats, write_stats = [], []
+    threads = [
+        threading.Thread(target=reader, args=(
+            handler, environ_for, urls, stop, read_stats))
+        for _ in range(readers)
+    ] + [
+        threading.Thread(target=writer, args=(
+            author, post_ids, stop, write_stats))
+        for _ in range(args.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies = sorted(
+        latency for thread_latencies, _ in read_stats
+        for latency in thread_latencies
+    )
+    return {
+        'readers': readers,
+        'writers': args.writers,
+        'reads_per_second': round(len(latencies) / args.duration, 1),
+        'writes_per_second': round(
+            sum(writes for writes, _ in write_stats) / args.duration, 1
+        ),
+        'read_errors': sum(errors for _, errors in read_stats),
+        'write_errors': sum(errors for _, errors in write_stats),
+        'read_p50_ms': percentile_ms(latencies, 50),
+        'read_p99_ms': percentile_ms(latencies, 99),
+    }
+
+
+def percentile_ms(values, percent):
+    if not values:
+        return None
+    return round(values[min(len(values) - 1,
+                            len(values) * percent // 100)] * 1000, 3)
+
+
+def main():
+    args = parse_args()
+
+    import django
+    from django.conf import settings
+    settings.DATABASES['default']['TEST'] = {'NAME': args.database}
+    settings.THUMBNAIL_WORKERS = 0
+    # Кеш страниц спрятал бы базу от читателей
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }}
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from posts.models import Post
+
+    setup_test_environment(debug=False)
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    seed(args.posts)
+    author = get_user_model().objects.get(username='author')
+    post_ids = list(Post.objects.values_list('id', flat=True)[:100])
+    urls = [reverse('posts:index')] + [
+        reverse('posts:post_detail', args=[post_id])
+        for post_id in post_ids[:20]
+    ]
+    factory = RequestFactory()
+
+    def environ_for(url):
+        return factory._base_environ(PATH_INFO=url, REQUEST_METHOD='GET')
+
+    # Настоящий обработчик WSGI: соединения закрываются по
+    # CONN_MAX_AGE в конце запроса, как на сервере
+    handler = WSGIHandler()
+    report = {}
+    for profile in PROFILES:
+        use_profile(profile)
+        report[profile] = [
+            run(readers, args, handler, environ_for, urls, author, post_ids)
+            for readers in args.readers
+        ]
+        for result in report[profile]:
+            print(f"{profile}: читателей {result['readers']}, "
+                  f"{result['reads_per_second']} чтений/с, "
+                  f"{result['writes_per_second']} записей/с, "
+                  f"ошибок {result['read_errors'] + result['write_errors']}",
+                  file=sys.stderr)
+    connection.creation.destroy_test_db(args.database, verbosity=0)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(output)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+
+
+if __name__ == '__main__':
+    main()
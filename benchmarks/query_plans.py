@@ -0,0 +1,102 @@
+"""Снимает EXPLAIN QUERY PLAN со всех запросов страниц лент.
+
+Работает с базой из настроек проекта, результат пишет в JSON,
+чтобы планы можно было сравнивать между коммитами:
+
+    python benchmarks/query_plans.py --output plans.json
+
+Шаги плана с полным сканом или временной сортировкой
+помечаются в поле warnings.
+"""
+import argparse
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+
+def feed_urls(reverse, Follow, Post):
+    follow = Follow.objects.select_related('user', 'author').first()
+    post = Post.objects.select_related('author', 'group').exclude(
+        group=None
+    ).first() or Post.objects.select_related('author').first()
+    if post is None:
+        sys.exit('В базе нет постов: планы снимать не на чем')
+    urls = {
+        'index': reverse('posts:index'),
+        'profile': reverse('posts:profile', args=[post.author.username]),
+        'post_detail': reverse('posts:post_detail', args=[post.id]),
+    }
+    if post.group:
+        urls['group_posts'] = reverse(
+            'posts:group_list', args=[post.group.slug]
+        )
+    if follow:
+        urls['follow_index'] = reverse('posts:follow_index')
+    return urls, follow.user if follow else post.author
+
+
+def explain(connection, sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def warnings_for(plan):
+    return [
+        step for step in plan
+        if 'TEMP B-TREE' in step
+        or step.startswith('SCAN') and 'INDEX' not in step
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--output', default='-',
+                        help='файл для JSON, по умолчанию stdout')
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import (CaptureQueriesContext,
+                                   setup_test_environment)
+    from django.urls import reverse
+    from posts.models import Follow, Post
+
+    setup_test_environment()
+    urls, user = feed_urls(reverse, Follow, Post)
+    client = Client()
+    client.force_login(user)
+    report = {}
+    for name, url in urls.items():
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        report[name] = []
+        for query in queries.captured_queries:
+            plan = explain(connection, query['sql'])
+            report[name].append({
+                'sql': query['sql'],
+                'plan': plan,
+                'warnings': warnings_for(plan),
+            })
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(output)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    if any(query['warnings'] for queries in report.values()
+           for query in queries):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""Замеряет страницы posts на заданном объёме данных.
+
+Заполняет отдельную базу SQLite пользователями, группами, постами,
+комментариями и подписками, затем для каждой страницы снимает
+перцентили времени ответа, число запросов, размер ответа
+и пик памяти. Результат пишет в JSON для сравнения между коммитами:
+
+    python benchmarks/views.py --posts-per-author 200 --output head.json
+    python benchmarks/views.py --keepdb --compare head.json
+
+С --keepdb база не пересоздаётся и заполняется, только если пуста.
+--template-profile production замеряет кешируемый загрузчик шаблонов
+(template_ms - время рендеринга из Server-Timing):
+
+    python benchmarks/views.py --keepdb --output before.json
+    python benchmarks/views.py --keepdb --template-profile production \\
+        --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+from itertools import islice
+from urllib.parse import urlencode
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+PERCENTILES = (50, 90, 99)
+# Поля сравнения с прошлым прогоном: рост - это ухудшение
+COMPARED = ('p50_ms', 'p90_ms', 'p99_ms', 'template_ms', 'queries',
+            'bytes', 'bytes_compressed', 'peak_memory_kb')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--groups', type=int, default=10)
+    parser.add_argument('--posts-per-author', type=int, default=20)
+    parser.add_argument('--follows-per-user', type=int, default=20)
+    parser.add_argument('--comments-per-post', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=50,
+                        help='замеров на страницу')
+    parser.add_argument('--warmup', type=int, default=5,
+                        help='запросов перед замерами')
+    parser.add_argument('--template-profile', default='default',
+                        choices=('default', 'production'),
+                        help='загрузчик шаблонов, см. core/templates.py')
+    parser.add_argument('--cold', action='store_true',
+                        help='очищать кеш перед каждым запросом')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database',
+                        default=os.path.join(BASE_DIR, 'benchmarks',
+                                             'bench.sqlite3'),
+                        help='файл базы для замеров')
+    parser.add_argument('--keepdb', action='store_true',
+                        help='не пересоздавать базу')
+    parser.add_argument('--output', default='-',
+                        help='файл для JSON, по умолчанию stdout')
+    parser.add_argument('--compare',
+                        help='JSON прошлого прогона для сравнения')
+    return parser.parse_args()
+
+
+def insert(model, objects, batch_size):
+    """bulk_create по частям: генератор не разворачивается в список.
+    Размер одной вставки Django подбирает сам под лимиты SQLite."""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def seed(args):
+    """Заполняет базу через bulk_create и пересчитывает
+    производные данные так же, как import_yatube."""
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from django.utils import timezone
+    from posts import dataset
+    from posts.models import Comment, Follow, Group, Post
+
+    User = get_user_model()
+    rng = random.Random(args.seed)
+    batch = dataset.DATASET_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        insert(User, (
+            User(username=f'user{i}', first_name='Имя', last_name=str(i))
+            for i in range(args.users)
+        ), batch)
+        insert(Group, (
+            Group(title=f'Группа {i}', slug=f'group-{i}',
+                  description='Описание') for i in range(args.groups)
+        ), batch)
+        users = list(User.objects.values_list('id', flat=True))
+        groups = list(Group.objects.values_list('id', flat=True)) + [None]
+        with dataset.preserved_timestamps(Post):
+            insert(Post, (
+                Post(text=f'Пост {i} автора {author} ' + 'текст ' * 20,
+                     author_id=author, group_id=rng.choice(groups),
+                     pub_date=now - timedelta(minutes=i * len(users) + n),
+                     updated=now - timedelta(minutes=i * len(users) + n))
+                for n, author in enumerate(users)
+                for i in range(args.posts_per_author)
+            ), batch)
+        insert(Follow, (
+            Follow(user_id=user, author_id=author)
+            for user in users
+            for author in rng.sample(
+                [other for other in users if other != user],
+                min(args.follows_per_user, len(users) - 1)
+            )
+        ), batch)
+        post_ids = Post.objects.order_by().values_list('id', flat=True)
+        insert(Comment, (
+            Comment(post_id=post, author_id=rng.choice(users),
+                    text=f'Комментарий {i}')
+            for post in post_ids.iterator()
+            for i in range(args.comments_per_post)
+        ), batch)
+    dataset.rebuild_derived()
+
+
+def scenarios(reverse):
+    """Имя, метод, адрес и данные формы для каждой страницы."""
+    from django.db.models import Count
+    from posts.models import Comment, Follow, Group, Post
+
+    follow = Follow.objects.select_related('user').first()
+    user = follow.user
+    group = Group.objects.annotate(total=Count('posts')).order_by(
+        '-total'
+    ).first()
+    post = Post.objects.annotate(total=Count('comments')).order_by(
+        '-total', 'id'
+    ).select_related('author').first()
+    comment_text = Comment.objects.values_list('text', flat=True).first()
+    return user, [
+        ('index', 'get', reverse('posts:index'), None),
+        ('group_posts', 'get',
+         reverse('posts:group_list', args=[group.slug]), None),
+        ('profile', 'get',
+         reverse('posts:profile', args=[post.author.username]), None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', args=[post.id]), None),
+        ('post_comments', 'get',
+         reverse('posts:post_comments', args=[post.id]), None),
+        ('follow_index', 'get', reverse('posts:follow_index'), None),
+        ('search', 'get',
+         reverse('posts:search') + '?' + urlencode(
+             {'q': comment_text or 'пост'}), None),
+        ('post_create', 'post', reverse('posts:post_create'),
+         {'text': 'Новый пост из замера', 'group': group.id}),
+    ]
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower
+    )
+
+
+def template_ms(response):
+    """Время рендеринга шаблонов из заголовка Server-Timing."""
+    for metric in response.get('Server-Timing', '').split(','):
+        name, *params = metric.strip().split(';')
+        if name == 'tpl':
+            return float(params[0].split('=')[1])
+    return 0.0
+
+
+def measure(client, method, url, data, args):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    request = getattr(client, method)
+    for _ in range(args.warmup):
+        if args.cold:
+            cache.clear()
+        request(url, data)
+    timings = []
+    templates = []
+    for _ in range(args.requests):
+        if args.cold:
+            cache.clear()
+        started = time.perf_counter()
+        response = request(url, data)
+        timings.append((time.perf_counter() - started) * 1000)
+        templates.append(template_ms(response))
+    # Запросы и память - отдельным прогоном, чтобы не мешать таймингам
+    if args.cold:
+        cache.clear()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        response = request(url, data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # captured_queries - срез queries_log, который следующий запрос
+    # очистит сигналом request_started: число снимается сразу
+    query_count = len(queries.captured_queries)
+    # Размер ответа, который получит браузер со сжатием
+    compressed = request(url, data, HTTP_ACCEPT_ENCODING='br, gzip')
+    result = {
+        'status': response.status_code,
+        'requests': args.requests,
+        'mean_ms': round(statistics.mean(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'template_ms': round(statistics.mean(templates), 3),
+        'queries': query_count,
+        'bytes': len(response.content),
+        'bytes_compressed': len(compressed.content),
+        'encoding': compressed.get('Content-Encoding', ''),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = round(percentile(timings, percent), 3)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, path):
+    """Печатает в stderr изменение метрик относительно прошлого прогона."""
+    with open(path, encoding='utf-8') as file:
+        base = json.load(file)
+    for name, result in report['results'].items():
+        old = base['results'].get(name)
+        if old is None:
+            continue
+        changes = []
+        for field in COMPARED:
+            if not old.get(field):
+                continue
+            delta = (result[field] - old[field]) / old[field] * 100
+            changes.append(f'{field} {delta:+.1f}%')
+        print(f'{name}: ' + ', '.join(changes), file=sys.stderr)
+
+
+def main():
+    args = parse_args()
+
+    import django
+    from django.conf import settings
+    settings.DATABASES['default']['TEST'] = {'NAME': args.database}
+    # Миниатюры в замерах не генерируются
+    settings.THUMBNAIL_WORKERS = 0
+    from core.templates import template_settings
+    settings.TEMPLATES = template_settings(settings.BASE_DIR, {
+        'YATUBE_TEMPLATE_PROFILE': args.template_profile,
+    })
+    if args.template_profile == 'default':
+        # Как в settings с DEBUG = True: иначе при DEBUG = False
+        # Django сам включил бы кешируемый загрузчик
+        settings.TEMPLATES[0]['OPTIONS']['debug'] = True
+    django.setup()
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from posts.models import Post
+
+    # Как в тестах: DEBUG выключен, debug toolbar не встраивается
+    setup_test_environment(debug=False)
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=args.keepdb
+    )
+    if not Post.objects.exists():
+        started = time.monotonic()
+        seed(args)
+        print(f'База заполнена за {time.monotonic() - started:.1f} с',
+              file=sys.stderr)
+
+    user, pages = scenarios(reverse)
+    client = Client()
+    client.force_login(user)
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'posts': Post.objects.count(),
+            'cold_cache': args.cold,
+            'template_profile': args.template_profile,
+            'options': vars(args),
+        },
+        'results': {},
+    }
+    for name, method, url, data in pages:
+        report['results'][name] = dict(
+            measure(client, method, url, data, args), url=url
+        )
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(output)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
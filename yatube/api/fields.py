@@ -0,0 +1,69 @@
+from operator import itemgetter
+
+from django.core.files.storage import default_storage
+
+
+class ApiError(Exception):
+    """Ошибка запроса к API: уходит клиенту JSON с нужным статусом."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def image_url(row):
+    return default_storage.url(row['image']) if row['image'] else None
+
+
+def author_name(row):
+    return ' '.join(filter(None, (
+        row['author__first_name'], row['author__last_name']
+    ))) or None
+
+
+# Поле ответа: колонки для values() и функция, собирающая значение
+# из строки. Модели не создаются, читаются только нужные колонки
+POST_FIELDS = {
+    'id': (('id',), itemgetter('id')),
+    'text': (('text',), itemgetter('text')),
+    'pub_date': (('pub_date',), itemgetter('pub_date')),
+    'updated': (('updated',), itemgetter('updated')),
+    'author': (('author__username',), itemgetter('author__username')),
+    'author_name': (('author__first_name', 'author__last_name'),
+                    author_name),
+    'group': (('group__slug',), itemgetter('group__slug')),
+    'image': (('image',), image_url),
+}
+COMMENT_FIELDS = {
+    'id': (('id',), itemgetter('id')),
+    'text': (('text',), itemgetter('text')),
+    'created': (('created',), itemgetter('created')),
+    'author': (('author__username',), itemgetter('author__username')),
+}
+
+
+class Fieldset:
+    """Поля ответа из ?fields=id,text. Колонки ключа курсора
+    читаются всегда, но в ответ попадают, только если их просили."""
+
+    def __init__(self, spec, names, required):
+        self.spec = spec
+        self.names = names
+        self.columns = list(dict.fromkeys([
+            *required,
+            *(column for name in names for column in spec[name][0]),
+        ]))
+
+    def serialize(self, row):
+        return {name: self.spec[name][1](row) for name in self.names}
+
+
+def get_fieldset(request, spec, required=('pub_date', 'id'),
+                 param='fields'):
+    raw = request.GET.get(param, '')
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in spec]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return Fieldset(spec, list(dict.fromkeys(names)) or list(spec), required)
@@ -0,0 +1,27 @@
+from posts.models import Post, TimelineEntry
+from posts.timeline import FollowFeedPaginator
+
+
+class FollowValuesPaginator(FollowFeedPaginator):
+    """Лента подписок строками values(): колонки поста читаются
+    через TimelineEntry и напрямую у авторов с fan-out on read."""
+
+    def __init__(self, user, per_page, columns):
+        self.columns = columns
+        super().__init__(user, per_page)
+
+    def entries(self, user):
+        return TimelineEntry.objects.filter(user=user).values(
+            'pub_date', 'post_id',
+            *[f'post__{column}' for column in self.columns]
+        )
+
+    def posts(self):
+        return Post.objects.values(*self.columns)
+
+    def _posts(self, entries):
+        return [{column: entry[f'post__{column}']
+                 for column in self.columns} for entry in entries]
+
+    def _key(self, item):
+        return [item['pub_date'], item['id']]
@@ -0,0 +1,136 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from api.views import POSTS_ON_PAGE
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostsApiTests(TestCase):
+    """Ленты и пост отдаются JSON с курсором и выбором полей"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(POSTS_ON_PAGE + 5)
+        )
+        cls.post = Post.objects.latest('pub_date', 'id')
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds(self):
+        """Общая лента, группа и профиль листаются курсором"""
+        urls = (
+            reverse('api:posts'),
+            reverse('api:group_posts', args=[self.group.slug]),
+            reverse('api:profile_posts', args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), POSTS_ON_PAGE)
+                self.assertEqual(data['results'][0], {
+                    'id': self.post.id,
+                    'text': self.post.text,
+                    'pub_date': self.post.pub_date.isoformat(),
+                    'updated': self.post.updated.isoformat(),
+                    'author': 'writer',
+                    'author_name': 'Лев Толстой',
+                    'group': 'test-slug',
+                    'image': None,
+                })
+                data = self.client.get(
+                    url, {'cursor': data['next_cursor']}
+                ).json()
+                self.assertEqual(len(data['results']), 5)
+                self.assertIsNone(data['next_cursor'])
+
+    def test_sparse_fields(self):
+        """?fields= сужает ответ и запрос к базе"""
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('api:posts'), {'fields': 'id,text', 'limit': 2}
+            )
+        self.assertEqual(response.json()['results'], [
+            {'id': self.post.id, 'text': self.post.text},
+            {'id': self.post.id - 1, 'text': 'Пост 23'},
+        ])
+        response = self.client.get(reverse('api:posts'), {'fields': 'pwd'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_limit(self):
+        """Неверный limit - ошибка 400, а не 500"""
+        for limit in ('²', 'abc', '0', '101'):
+            with self.subTest(limit=limit):
+                response = self.client.get(reverse('api:posts'),
+                                           {'limit': limit})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('limit', response.json()['error'])
+
+    def test_post_detail(self):
+        """Пост отдаётся с первой порцией комментариев"""
+        data = self.client.get(
+            reverse('api:post_detail', args=[self.post.id]),
+            {'fields': 'text', 'comment_fields': 'author,text'},
+        ).json()
+        self.assertEqual(data['post'], {'text': self.post.text})
+        self.assertEqual(data['comments']['results'], [
+            {'author': 'reader', 'text': 'Комментарий'},
+        ])
+        response = self.client.get(reverse('api:post_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json())
+
+    def test_missing_group(self):
+        """Несуществующая группа - 404 в JSON"""
+        response = self.client.get(reverse('api:group_posts', args=['no']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_requires_login(self):
+        """Лента подписок только для авторизованных"""
+        response = self.client.get(reverse('api:follow_posts'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_follow_feed(self):
+        """Лента подписок собирается и из TimelineEntry,
+        и из постов популярных авторов"""
+        self.client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse('api:follow_posts')
+        data = self.client.get(url, {'fields': 'id'}).json()
+        self.assertEqual(data['results'][0], {'id': self.post.id})
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            self.assertEqual(self.client.get(url, {'fields': 'id'}).json(),
+                             data)
+
+    def test_export_streams_all_posts(self):
+        """Выгрузка отдаёт все посты потоком NDJSON"""
+        response = self.client.get(
+            reverse('api:posts_export'), {'fields': 'id', 'author': 'writer'}
+        )
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), POSTS_ON_PAGE + 5)
+        self.assertEqual(rows[0], {'id': self.post.id})
+
+    def test_read_only(self):
+        """Запись через API не принимается"""
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,182 @@
+import json
+from functools import wraps
+
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+
+from posts import conditional
+from posts.dataset import DatasetEncoder
+from posts.models import Comment, Group, Post, User
+from posts.paginator import CursorPaginator
+
+from .fields import ApiError, COMMENT_FIELDS, POST_FIELDS, get_fieldset
+from .pagination import FollowValuesPaginator
+
+POSTS_ON_PAGE = 20
+COMMENTS_ON_PAGE = 20
+# Верхняя граница ?limit=
+MAX_PAGE_SIZE = 100
+# Строк на один запрос к базе при потоковой выгрузке
+EXPORT_CHUNK_SIZE = 500
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=DatasetEncoder,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def api_view(view):
+    """Только чтение; ошибки уходят JSON, а не HTML-страницей."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = json_response(
+                {'error': 'Метод не поддерживается'}, status=405
+            )
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response({'error': error.message}, error.status)
+        except Http404:
+            return json_response({'error': 'Не найдено'}, status=404)
+    return wrapper
+
+
+def page_size(request, default):
+    raw = request.GET.get('limit')
+    if raw is None:
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ApiError(f'limit должен быть от 1 до {MAX_PAGE_SIZE}')
+    return limit
+
+
+def serialize_page(page, fields):
+    return {
+        'results': [fields.serialize(row) for row in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    }
+
+
+def posts_page(request, posts):
+    fields = get_fieldset(request, POST_FIELDS)
+    paginator = CursorPaginator(posts.values(*fields.columns),
+                                page_size(request, POSTS_ON_PAGE))
+    return paginator.get_page(request.GET.get('cursor')), fields
+
+
+def comments_page(request, post_id, cursor_param, fields_param):
+    fields = get_fieldset(request, COMMENT_FIELDS, ('created', 'id'),
+                          param=fields_param)
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).values(*fields.columns),
+        page_size(request, COMMENTS_ON_PAGE), ordering=('created', 'id'),
+    )
+    page = paginator.get_page(request.GET.get(cursor_param))
+    return serialize_page(page, fields)
+
+
+@api_view
+@conditional.index_condition
+def posts(request):
+    page, fields = posts_page(request, Post.objects.all())
+    return json_response(serialize_page(page, fields))
+
+
+@api_view
+@conditional.group_condition
+def group_posts(request, slug):
+    page, fields = posts_page(request, Post.objects.filter(group__slug=slug))
+    # Существование группы проверяем, только если постов нет
+    if not page and not Group.objects.filter(slug=slug).exists():
+        raise Http404
+    return json_response(serialize_page(page, fields))
+
+
+@api_view
+@conditional.profile_condition
+def profile_posts(request, username):
+    page, fields = posts_page(
+        request, Post.objects.filter(author__username=username)
+    )
+    if not page and not User.objects.filter(username=username).exists():
+        raise Http404
+    return json_response(serialize_page(page, fields))
+
+
+@api_view
+@conditional.follow_condition
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация', status=401)
+    fields = get_fieldset(request, POST_FIELDS)
+    paginator = FollowValuesPaginator(
+        request.user, page_size(request, POSTS_ON_PAGE), fields.columns
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    return json_response(serialize_page(page, fields))
+
+
+@api_view
+@conditional.post_condition
+def post_detail(request, post_id):
+    """Пост и первая порция комментариев; следующие -
+    через post_comments по comments.next_cursor."""
+    fields = get_fieldset(request, POST_FIELDS)
+    post = Post.objects.filter(pk=post_id).values(*fields.columns).first()
+    if post is None:
+        raise Http404
+    return json_response({
+        'post': fields.serialize(post),
+        'comments': comments_page(request, post_id, 'comments_cursor',
+                                  'comment_fields'),
+    })
+
+
+@api_view
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return json_response(
+        comments_page(request, post_id, 'cursor', 'fields')
+    )
+
+
+def export_lines(queryset, fields):
+    """NDJSON по пачкам ключа (pub_date, id): в памяти одна пачка,
+    сколько бы постов ни было."""
+    paginator = CursorPaginator(queryset, EXPORT_CHUNK_SIZE)
+    values = None
+    while True:
+        rows = list(paginator.keyset(
+            paginator.object_list, values, forward=True
+        )[:EXPORT_CHUNK_SIZE])
+        if not rows:
+            return
+        yield ''.join(
+            json.dumps(fields.serialize(row), cls=DatasetEncoder,
+                       ensure_ascii=False) + '\n'
+            for row in rows
+        )
+        values = [rows[-1][field] for field in paginator.fields]
+
+
+@api_view
+def posts_export(request):
+    """Все посты потоком NDJSON, с отбором ?group= и ?author=."""
+    fields = get_fieldset(request, POST_FIELDS)
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return StreamingHttpResponse(
+        export_lines(posts.values(*fields.columns), fields),
+        content_type='application/x-ndjson; charset=utf-8',
+    )
@@ -0,0 +1,158 @@
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+# Потоков, одновременно выполняющих view: столько же соединений
+# с базой и не больше, сколько SQLite выдержит без очереди на блокировке
+ASGI_THREADS = 8
+
+
+def scope_to_environ(scope, body):
+    """WSGI environ из HTTP scope ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI передаёт путь байтами в latin-1
+        'PATH_INFO': scope['path'].encode().decode('iso-8859-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('iso-8859-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin1').upper().replace('-', '_')
+        value = raw_value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            # HTTP/2 присылает cookie отдельными заголовками, их
+            # разделитель - '; ', у остальных заголовков - ','
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+class ASGIHandler:
+    """ASGI-приложение поверх обычного обработчика Django.
+
+    В Django 2.2 нет асинхронных view и ORM, поэтому цикл событий
+    только принимает соединения и читает тела запросов, а view,
+    middleware и запросы к базе выполняются в ограниченном пуле
+    потоков. Обычный ответ собирается в потоке целиком и отдаётся
+    клиенту уже из цикла событий: медленный клиент держит корутину,
+    а не поток с соединением к базе. Потоковый ответ (выгрузка,
+    файл) читает базу по ходу отдачи, поэтому отдаётся из потока
+    пула: соединения с базой и замеры запроса живут в thread-local."""
+
+    def __init__(self, max_workers=None):
+        self.wsgi = WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or getattr(
+                settings, 'ASGI_THREADS', ASGI_THREADS
+            ),
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f"Неподдерживаемый тип ASGI: {scope['type']}")
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self.executor, self.respond,
+            scope_to_environ(scope, body), loop, send,
+        )
+        if response is None:
+            return
+        status, headers, content = response
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def read_body(self, receive):
+        """Тело запроса целиком или None, если клиент отключился."""
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    def respond(self, environ, loop, send):
+        """Выполняет запрос в потоке пула. Обычный ответ возвращает
+        как (status, headers, body), потоковый отдаёт в цикл событий
+        по частям сам и возвращает None."""
+        def deliver(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        response = self.wsgi(environ, start_response)
+        if not getattr(response, 'streaming', False):
+            try:
+                content = b''.join(response)
+            finally:
+                # Закрытие шлёт request_finished и закрывает
+                # соединения с базой этого потока
+                response.close()
+            return started['status'], started['headers'], content
+        try:
+            deliver({
+                'type': 'http.response.start',
+                'status': started['status'],
+                'headers': started['headers'],
+            })
+            for chunk in response:
+                if chunk:
+                    deliver({'type': 'http.response.body', 'body': chunk,
+                             'more_body': True})
+            deliver({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Закрытие шлёт request_finished и закрывает соединения
+            # с базой этого потока
+            response.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def get_asgi_application():
+    import django
+
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,113 @@
+import os
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+from . import metrics
+
+# Бэкенды, которые выбираются переменной окружения YATUBE_CACHE.
+# locmem - отдельный кеш в каждом процессе, остальные общие
+# для всех воркеров.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'django.core.cache.backends.db.DatabaseCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+DEFAULT_LOCATIONS = {
+    'file': 'cache',
+    'sqlite': 'yatube_cache',
+}
+
+
+def cache_settings(base_dir, environ=os.environ):
+    """Собирает settings.CACHES по переменным окружения:
+    YATUBE_CACHE - имя бэкенда, YATUBE_CACHE_LOCATION - каталог,
+    таблица или адрес сервера."""
+    name = environ.get('YATUBE_CACHE', 'locmem')
+    if name not in CACHE_BACKENDS:
+        raise ImproperlyConfigured(
+            f'YATUBE_CACHE должен быть одним из {sorted(CACHE_BACKENDS)}'
+        )
+    location = environ.get('YATUBE_CACHE_LOCATION',
+                           DEFAULT_LOCATIONS.get(name, ''))
+    if name == 'file':
+        location = os.path.join(base_dir, location)
+    if name == 'redis' and not location:
+        raise ImproperlyConfigured(
+            'Для YATUBE_CACHE=redis задайте YATUBE_CACHE_LOCATION'
+        )
+    return {
+        'default': {
+            'BACKEND': CACHE_BACKENDS[name],
+            'LOCATION': location,
+            'KEY_PREFIX': 'index_page',
+        }
+    }
+
+
+MISSING = object()
+
+
+class CountingCache:
+    """Прокси к кешу с подсчётом попаданий и промахов чтения.
+    Счётчики общие для процесса; запись и остальные методы
+    передаются бэкенду как есть."""
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @property
+    def process_local(self):
+        """Кеш виден только своему процессу: сброс в одном воркере
+        не доходит до остальных."""
+        return isinstance(self.backend, (LocMemCache, DummyCache))
+
+    def get(self, key, default=None, version=None):
+        value = self.backend.get(key, MISSING, version=version)
+        if value is MISSING:
+            self._count(0, 1)
+            return default
+        self._count(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.backend.get_many(keys, version=version)
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': hits,
+            'misses': misses,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+        metrics.record_cache(hits, misses)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+cache = CountingCache()
@@ -0,0 +1,104 @@
+import gzip
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from django.conf import settings
+
+# Короче порога ответ не сжимается: выигрыш съедят заголовки
+# формата и время на сжатие
+COMPRESS_MIN_SIZE = 500
+# Уровни для ответов на лету; статика сжимается один раз, до упора
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESS_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson',
+    'application/javascript', 'application/xml', 'application/rss+xml',
+    'application/atom+xml', 'image/svg+xml',
+)
+
+PROTECTED_HTML = re.compile(
+    r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.S | re.I
+)
+HTML_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+WHITESPACE = re.compile(r'\s+')
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding, encodings=None):
+    """Лучшее из доступных сжатий по Accept-Encoding с учётом q.
+    При равном q предпочтение - в порядке encodings (br раньше gzip)."""
+    encodings = encodings or available_encodings()
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best = None
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > 0 and (best is None or weight > best[1]):
+            best = (encoding, weight)
+    return best and best[0]
+
+
+def compress(data, encoding, level=None):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level or BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=level or GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает потоковый ответ по частям, не собирая его целиком."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    # 16 + MAX_WBITS - формат gzip с заголовком и контрольной суммой
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED,
+                                  16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compressible(content_type):
+    content_type = content_type.split(';')[0].strip().lower()
+    return content_type.startswith(COMPRESS_TYPES)
+
+
+def min_size():
+    return getattr(settings, 'COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE)
+
+
+def minify_html(source):
+    """Убирает HTML-комментарии и схлопывает пробелы до одного.
+    Содержимое pre, textarea, script и style не трогается."""
+    parts = PROTECTED_HTML.split(source)
+    result = []
+    # split с двумя группами: текст, блок целиком, имя тега, текст...
+    for position in range(0, len(parts), 3):
+        text = HTML_COMMENT.sub('', parts[position])
+        result.append(WHITESPACE.sub(' ', text))
+        if position + 1 < len(parts):
+            result.append(parts[position + 1])
+    return ''.join(result).strip()
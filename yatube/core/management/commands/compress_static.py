@@ -0,0 +1,28 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.static import precompress
+
+
+class Command(BaseCommand):
+    help = ('Готовит сжатые копии (.gz и .br, если есть brotli) '
+            'статики из STATICFILES_DIRS для отдачи без сжатия на лету')
+
+    def handle(self, *args, **options):
+        totals = {}
+        for directory in settings.STATICFILES_DIRS:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    for encoding, size, compressed in precompress(
+                            os.path.join(root, name)):
+                        count, before, after = totals.get(encoding,
+                                                          (0, 0, 0))
+                        totals[encoding] = (count + 1, before + size,
+                                            after + compressed)
+        for encoding, (count, before, after) in sorted(totals.items()):
+            self.stdout.write(
+                f'{encoding}: файлов {count}, {before} -> {after} байт '
+                f'(-{(before - after) / before:.0%})'
+            )
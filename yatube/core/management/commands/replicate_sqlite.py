@@ -0,0 +1,45 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def copy_database(source, target):
+    """Копирует файл SQLite через backup API: копия согласована,
+    даже если в основную базу в это время пишут."""
+    primary = sqlite3.connect(source)
+    replica = sqlite3.connect(target)
+    try:
+        primary.backup(replica)
+    finally:
+        replica.close()
+        primary.close()
+
+
+class Command(BaseCommand):
+    help = ('Замена репликации для локальной проверки: копирует основную '
+            'базу SQLite в файлы реплик из DATABASE_REPLICAS')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять копирование каждые N секунд; 0 - один раз',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте '
+                               'YATUBE_DB_REPLICAS')
+        source = settings.DATABASES['default']['NAME']
+        while True:
+            started = time.monotonic()
+            for alias in settings.DATABASE_REPLICAS:
+                copy_database(source, settings.DATABASES[alias]['NAME'])
+            self.stdout.write(
+                f'Реплики обновлены за '
+                f'{(time.monotonic() - started) * 1000:.0f} мс'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.templates import warm
+
+
+class Command(BaseCommand):
+    help = ('Разбирает все шаблоны из templates/ и проверяет шаблоны '
+            'из extends и include. Перед выкладкой находит ошибки, '
+            'которые иначе всплыли бы на первом запросе')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count, errors = warm()
+        if errors:
+            raise CommandError('Ошибки в шаблонах:\n' + '\n'.join(errors))
+        self.stdout.write(
+            f'Шаблонов: {count}, {time.monotonic() - started:.2f} с'
+        )
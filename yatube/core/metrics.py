@@ -0,0 +1,143 @@
+import threading
+import time
+from functools import wraps
+
+# Границы корзин гистограммы времени ответа, мс
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Замеры одного запроса: SQL, шаблоны и кеш."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(duration for duration, _ in self.queries)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def top_queries(self, limit):
+        return sorted(self.queries, key=lambda query: -query[0])[:limit]
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - started, sql))
+
+
+def start():
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def stop():
+    _local.metrics = None
+
+
+def current():
+    return getattr(_local, 'metrics', None)
+
+
+def record_cache(hits, misses):
+    metrics = current()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+def timed_render(render):
+    """Считает время рендеринга шаблонов. Вложенные шаблоны
+    (карточки постов внутри страницы) входят во внешний."""
+    @wraps(render)
+    def wrapper(*args, **kwargs):
+        metrics = current()
+        if metrics is None:
+            return render(*args, **kwargs)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(*args, **kwargs)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+def install():
+    from django.template.backends.django import Template
+
+    if not getattr(Template.render, 'timed', False):
+        Template.render = timed_render(Template.render)
+
+
+class Registry:
+    """Сводка по процессу: число запросов, гистограмма времени
+    и суммы по каждому имени URL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = {}
+
+    def record(self, name, metrics, duration):
+        with self._lock:
+            view = self.views.setdefault(name, {
+                'requests': 0,
+                'buckets': [0] * len(BUCKETS),
+                'total_ms': 0.0,
+                'db_ms': 0.0,
+                'template_ms': 0.0,
+                'queries': 0,
+                'cache_hits': 0,
+                'cache_misses': 0,
+            })
+            milliseconds = duration * 1000
+            view['requests'] += 1
+            view['buckets'][next(
+                position for position, bound in enumerate(BUCKETS)
+                if milliseconds <= bound
+            )] += 1
+            view['total_ms'] += milliseconds
+            view['db_ms'] += metrics.db_time * 1000
+            view['template_ms'] += metrics.template_time * 1000
+            view['queries'] += metrics.query_count
+            view['cache_hits'] += metrics.cache_hits
+            view['cache_misses'] += metrics.cache_misses
+
+    def snapshot(self):
+        with self._lock:
+            views = {name: dict(view, buckets=list(view['buckets']))
+                     for name, view in self.views.items()}
+        for view in views.values():
+            view['buckets'] = {
+                ('+Inf' if bound == float('inf') else str(bound)): count
+                for bound, count in zip(BUCKETS, view['buckets'])
+            }
+            for field in ('total_ms', 'db_ms', 'template_ms'):
+                view[field] = round(view[field], 3)
+        return views
+
+    def reset(self):
+        with self._lock:
+            self.views = {}
+
+
+registry = Registry()
@@ -0,0 +1,137 @@
+import logging
+import random
+import re
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import compression, metrics, routers
+
+logger = logging.getLogger(__name__)
+
+# Медленные запросы: порог, доля попадающих в лог и число запросов SQL
+SLOW_REQUEST_MS = 500
+SLOW_REQUEST_SAMPLE_RATE = 1.0
+SLOW_REQUEST_TOP_QUERIES = 5
+
+
+def server_timing(current, duration):
+    """Заголовок Server-Timing: браузер покажет его во вкладке сети."""
+    return ', '.join((
+        f'db;dur={current.db_time * 1000:.1f};'
+        f'desc="{current.query_count} queries"',
+        f'tpl;dur={current.template_time * 1000:.1f}',
+        f'cache;desc="hits={current.cache_hits} '
+        f'misses={current.cache_misses}"',
+        f'total;dur={duration * 1000:.1f}',
+    ))
+
+
+class InstrumentationMiddleware:
+    """Считает запросы к базе, время SQL и шаблонов, попадания в кеш.
+    Отдаёт их в Server-Timing и копит сводку по имени URL для /metrics/.
+    Медленные запросы попадают в лог с самыми долгими SQL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.install()
+
+    def __call__(self, request):
+        current = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(current))
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        duration = current.elapsed()
+        response['Server-Timing'] = server_timing(current, duration)
+        match = request.resolver_match
+        metrics.registry.record(
+            match.view_name if match else 'unresolved', current, duration
+        )
+        self.log_slow(request, current, duration)
+        return response
+
+    def log_slow(self, request, current, duration):
+        threshold = getattr(settings, 'SLOW_REQUEST_MS', SLOW_REQUEST_MS)
+        rate = getattr(settings, 'SLOW_REQUEST_SAMPLE_RATE',
+                       SLOW_REQUEST_SAMPLE_RATE)
+        if duration * 1000 < threshold or random.random() >= rate:
+            return
+        top = current.top_queries(SLOW_REQUEST_TOP_QUERIES)
+        logger.warning(
+            'Медленный запрос %s %s: %.0f мс, SQL %d за %.0f мс\n%s',
+            request.method, request.get_full_path(), duration * 1000,
+            current.query_count, current.db_time * 1000,
+            '\n'.join(f'{seconds * 1000:8.1f} мс  {sql}'
+                      for seconds, sql in top),
+        )
+
+
+class ReplicaMiddleware:
+    """Разрешает чтение с реплик на время запроса. После записи
+    ставит cookie, и следующие запросы пользователя читают
+    с основной базы, пока реплики не догонят."""
+
+    cookie_name = 'primary_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.start_request(pinned=self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.finish_request()
+        if wrote and routers.replicas():
+            response.set_cookie(
+                self.cookie_name, '1', httponly=True, samesite='Lax',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS',
+                                routers.REPLICA_PIN_SECONDS),
+            )
+        return response
+
+
+class CompressionMiddleware:
+    """Сжимает текстовые ответы в Brotli (если установлен пакет
+    brotli) или gzip по Accept-Encoding клиента. Ответы короче
+    COMPRESS_MIN_SIZE не сжимаются, потоковые - сжимаются по частям."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.has_header('Content-Encoding')
+                or not compression.compressible(
+                    response.get('Content-Type', ''))):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            if len(response.content) < compression.min_size():
+                return response
+            compressed = compression.compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        # Сжатый ответ побайтно отличается от исходного
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,97 @@
+import os
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Сколько секунд после записи пользователь читает с основной базы:
+# запас на отставание реплик
+REPLICA_PIN_SECONDS = 10
+
+_state = threading.local()
+# Служебные таблицы: кеш (YATUBE_CACHE=sqlite) и хранилище ключей
+# sorl-thumbnail. Запись в них - не данные пользователя и не
+# закрепляет его за основной базой
+SERVICE_APP_LABELS = ('django_cache', 'thumbnail')
+
+
+def replica_databases(base_dir, environ=os.environ):
+    """Реплики SQLite для settings.DATABASES: YATUBE_DB_REPLICAS=2
+    даёт replica1 и replica2 в файлах рядом с основной базой.
+    В тестах реплики - зеркала основной базы."""
+    count = int(environ.get('YATUBE_DB_REPLICAS', 0))
+    return {
+        f'replica{number}': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(base_dir, f'db.replica{number}.sqlite3'),
+            'TEST': {'MIRROR': 'default'},
+        }
+        for number in range(1, count + 1)
+    }
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def start_request(pinned):
+    """Запрос может читать с реплик; pinned - пользователь недавно
+    писал и должен видеть свои изменения."""
+    _state.in_request = True
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+@contextmanager
+def primary():
+    """Чтение внутри блока - только с default. Для данных, которые
+    кешируются под текущим поколением лент: страница, собранная
+    с отстающей реплики, пережила бы смену поколения."""
+    _state.primary = getattr(_state, 'primary', 0) + 1
+    try:
+        yield
+    finally:
+        _state.primary -= 1
+
+
+def finish_request():
+    """Завершает запрос, возвращает True, если в нём была запись."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.in_request = _state.pinned = _state.wrote = False
+    return wrote
+
+
+class ReplicaRouter:
+    """Запись - в default, чтение в запросах - со случайной реплики.
+
+    Вне запросов (команды, пул миниатюр), внутри транзакции
+    и после записи в этом же запросе чтение идёт с default,
+    чтобы видеть только что записанное. Таблица кеша (поколения
+    лент и блокировки) и блоки primary() тоже читаются с default."""
+
+    def db_for_read(self, model, **hints):
+        from django.db import connections
+
+        aliases = replicas()
+        if (not aliases
+                or model._meta.app_label == 'django_cache'
+                or not getattr(_state, 'in_request', False)
+                or getattr(_state, 'pinned', False)
+                or getattr(_state, 'primary', 0)
+                or connections['default'].in_atomic_block):
+            return 'default'
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        if (getattr(_state, 'in_request', False)
+                and model._meta.app_label not in SERVICE_APP_LABELS):
+            _state.wrote = _state.pinned = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с копией основной базы
+        return db == 'default'
@@ -0,0 +1,30 @@
+from django.conf import settings
+
+# Прагмы профиля production. WAL пускает читателей параллельно
+# с писателем, synchronous=NORMAL в режиме WAL не теряет целостность
+# при сбое процесса, а busy_timeout заставляет ждать блокировку
+# вместо мгновенной ошибки database is locked.
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    # Отрицательное значение - размер в килобайтах: 64 МБ
+    ('cache_size', -64000),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('busy_timeout', 5000),
+    ('temp_store', 'MEMORY'),
+)
+
+
+def apply_pragmas(cursor, pragmas=SQLITE_PRAGMAS):
+    for name, value in pragmas:
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: включает прагмы профиля
+    production на каждом новом соединении с SQLite."""
+    if connection.vendor != 'sqlite' or not getattr(
+            settings, 'SQLITE_PRODUCTION', False):
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor)
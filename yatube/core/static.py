@@ -0,0 +1,135 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import compression
+
+# Сжатые копии: расширение файла для каждого Content-Encoding
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+# Типы, которые имеет смысл сжимать заранее
+PRECOMPRESS_EXTENSIONS = (
+    '.css', '.js', '.svg', '.ico', '.json', '.txt', '.xml', '.html', '.map',
+)
+STATIC_MAX_AGE = 60 * 60
+# Имя с хешем содержимого не меняет содержимое: кешируется на год
+HASHED_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def precompress(path):
+    """Пишет рядом с файлом .gz и, если есть brotli, .br с наибольшей
+    степенью сжатия. Копия, которая не меньше оригинала, не пишется.
+    Возвращает [(encoding, исходный размер, сжатый размер)]."""
+    if not path.endswith(PRECOMPRESS_EXTENSIONS):
+        return []
+    with open(path, 'rb') as file:
+        data = file.read()
+    written = []
+    for encoding in compression.available_encodings():
+        compressed = compression.compress(
+            data, encoding, level=11 if encoding == 'br' else 9
+        )
+        target = path + SUFFIXES[encoding]
+        if len(compressed) >= len(data):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        with open(target, 'wb') as file:
+            file.write(compressed)
+        written.append((encoding, len(data), len(compressed)))
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище collectstatic: имена файлов с хешем содержимого
+    (css/bootstrap.min.4b1c2e3f9a0d.css), манифест staticfiles.json
+    для {% static %} и сжатые копии рядом с файлами с хешем."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run=dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        # Копии пишутся после всех проходов: CSS к этому времени уже
+        # ссылается на картинки с хешем
+        for hashed_name in sorted(hashed_names):
+            precompress(self.path(hashed_name))
+
+
+def compressed_copy(absolute, encoding, mtime):
+    """Путь к сжатой копии файла, если она не старше оригинала:
+    правка файла в STATICFILES_DIRS делает копию устаревшей."""
+    copy = absolute + SUFFIXES[encoding]
+    try:
+        if os.stat(copy).st_mtime >= mtime:
+            return copy
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def is_hashed(path):
+    """Имя из манифеста collectstatic, содержимое которого не меняется."""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    return bool(hashed_files) and path in hashed_files.values()
+
+
+def find(path):
+    """Файл статики: сначала собранный collectstatic в STATIC_ROOT,
+    затем в STATICFILES_DIRS и каталогах приложений."""
+    if path.endswith(tuple(SUFFIXES.values())):
+        return None
+    if settings.STATIC_ROOT:
+        collected = safe_join(settings.STATIC_ROOT, path)
+        if os.path.isfile(collected):
+            return collected
+    return finders.find(path)
+
+
+def serve(request, path):
+    """Отдаёт статику, выбирая заранее сжатую копию по
+    Accept-Encoding. Сжатые копии готовят collectstatic
+    и compress_static. Файлы с хешем в имени кешируются на год."""
+    path = os.path.normpath(path).lstrip('/')
+    absolute = find(path)
+    if not absolute or not os.path.isfile(absolute):
+        raise Http404
+    content_type = mimetypes.guess_type(absolute)[0]
+    stat = os.stat(absolute)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+    available = [encoding for encoding in compression.available_encodings()
+                 if compressed_copy(absolute, encoding, stat.st_mtime)]
+    encoding = available and compression.choose_encoding(
+        request.META.get('HTTP_ACCEPT_ENCODING', ''), available
+    )
+    filename = absolute + SUFFIXES[encoding] if encoding else absolute
+    response = FileResponse(
+        open(filename, 'rb'),
+        content_type=content_type or 'application/octet-stream'
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if available:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if is_hashed(path):
+        response['Cache-Control'] = (
+            f'public, max-age={HASHED_MAX_AGE}, immutable'
+        )
+    else:
+        response['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}'
+    return response
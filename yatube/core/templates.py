@@ -0,0 +1,103 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+CONTEXT_PROCESSORS = [
+    'django.template.context_processors.debug',
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+    'django.contrib.messages.context_processors.messages',
+    'core.context_processors.year.year',
+]
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+FILESYSTEM_LOADER = 'django.template.loaders.filesystem.Loader'
+MINIFYING_LOADER = 'core.loaders.MinifyingLoader'
+APP_DIRECTORIES_LOADER = 'django.template.loaders.app_directories.Loader'
+
+
+def template_settings(base_dir, environ=os.environ):
+    """Собирает settings.TEMPLATES. YATUBE_TEMPLATE_PROFILE=production
+    включает кешируемый загрузчик: шаблон ищется и разбирается один
+    раз на процесс, даже при DEBUG = True. YATUBE_MINIFY_HTML=1
+    (по умолчанию в production) убирает из шаблонов проекта
+    комментарии и отступы."""
+    options = {'context_processors': CONTEXT_PROCESSORS}
+    production = environ.get('YATUBE_TEMPLATE_PROFILE') == 'production'
+    minify = environ.get(
+        'YATUBE_MINIFY_HTML', '1' if production else '0'
+    ) == '1'
+    loaders = [MINIFYING_LOADER if minify else FILESYSTEM_LOADER,
+               APP_DIRECTORIES_LOADER]
+    if production:
+        options.update(loaders=[(CACHED_LOADER, loaders)], debug=False)
+    elif minify:
+        options.update(loaders=loaders)
+    return [{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [os.path.join(base_dir, 'templates')],
+        'APP_DIRS': 'loaders' not in options,
+        'OPTIONS': options,
+    }]
+
+
+def template_names(engine):
+    """Имена всех шаблонов в каталогах DIRS движка."""
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                yield os.path.relpath(
+                    os.path.join(root, name), directory
+                ).replace(os.sep, '/')
+
+
+def referenced_names(template):
+    """Постоянные имена из {% extends %} и {% include %} шаблона:
+    Django ищет их только при рендеринге."""
+    from django.template.loader_tags import ExtendsNode, IncludeNode
+
+    for node in template.nodelist.get_nodes_by_type(ExtendsNode):
+        if isinstance(node.parent_name.var, str):
+            yield node.parent_name.var
+    for node in template.nodelist.get_nodes_by_type(IncludeNode):
+        if isinstance(node.template.var, str):
+            yield node.template.var
+
+
+def warm(engine=None):
+    """Разбирает все шаблоны проекта и проверяет, что шаблоны из
+    extends и include существуют. С кешируемым загрузчиком разобранные
+    шаблоны остаются в памяти. Возвращает (число шаблонов, ошибки)."""
+    from django.template import TemplateDoesNotExist, TemplateSyntaxError
+    from django.template import engines
+
+    engine = engine or engines['django'].engine
+    errors = []
+    names = list(template_names(engine))
+    for name in names:
+        try:
+            template = engine.get_template(name)
+        except TemplateSyntaxError as error:
+            errors.append(f'{name}: {error}')
+            continue
+        for reference in referenced_names(template):
+            try:
+                engine.get_template(reference)
+            except TemplateDoesNotExist:
+                errors.append(f'{name}: нет шаблона {reference}')
+    return len(names), errors
+
+
+def warm_on_startup():
+    """Прогрев при запуске сервера в профиле production:
+    ошибка в шаблонах останавливает запуск, а не первый запрос."""
+    from django.conf import settings
+
+    loaders = settings.TEMPLATES[0].get('OPTIONS', {}).get('loaders', [])
+    if not any(loader[0] == CACHED_LOADER for loader in loaders
+               if isinstance(loader, tuple)):
+        return
+    _, errors = warm()
+    if errors:
+        raise ImproperlyConfigured(
+            'Ошибки в шаблонах:\n' + '\n'.join(errors)
+        )
@@ -0,0 +1,151 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+
+from core.asgi import ASGIHandler, scope_to_environ
+from posts.models import Post
+
+User = get_user_model()
+
+
+def http_scope(path, method='GET', query_string=b'', headers=()):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': list(headers),
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+class ASGIHandlerTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.handler = ASGIHandler(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.handler.executor.shutdown()
+        super().tearDownClass()
+
+    def request(self, scope, body=b''):
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.handler(scope, receive, send))
+        return sent
+
+    def test_environ(self):
+        """Путь, строка запроса и заголовки переходят в environ"""
+        environ = scope_to_environ(http_scope(
+            '/profile/автор/', query_string=b'cursor=abc',
+            headers=[(b'content-type', b'text/plain'),
+                     (b'accept', b'text/html'), (b'accept', b'*/*')],
+        ), b'')
+        self.assertEqual(environ['PATH_INFO'].encode('iso-8859-1').decode(),
+                         '/profile/автор/')
+        self.assertEqual(environ['QUERY_STRING'], 'cursor=abc')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['REMOTE_ADDR'], '127.0.0.1')
+
+    def test_repeated_cookies(self):
+        """Несколько заголовков cookie (HTTP/2) склеиваются через '; '"""
+        environ = scope_to_environ(http_scope('/', headers=[
+            (b'cookie', b'sessionid=abc'), (b'cookie', b'csrftoken=xyz'),
+        ]), b'')
+        self.assertEqual(environ['HTTP_COOKIE'],
+                         'sessionid=abc; csrftoken=xyz')
+
+    def test_page(self):
+        """Страница отдаётся через пул потоков"""
+        start, *body = self.request(http_scope(reverse('about:author')))
+        self.assertEqual(start['type'], 'http.response.start')
+        self.assertEqual(start['status'], 200)
+        self.assertIn(b'server-timing', dict(start['headers']))
+        self.assertFalse(body[-1].get('more_body'))
+        self.assertTrue(b''.join(message['body'] for message in body))
+
+    def test_slow_client_releases_thread(self):
+        """Медленный клиент обычной страницы не держит поток пула"""
+        handler = ASGIHandler(max_workers=1)
+        self.addCleanup(handler.executor.shutdown)
+        url = reverse('about:author')
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def run():
+            second_done = asyncio.Event()
+            sent = []
+
+            async def slow_send(message):
+                # Первый клиент не читает ответ, пока не ответят второму
+                await second_done.wait()
+
+            async def send(message):
+                sent.append(message)
+
+            async def second():
+                await handler(http_scope(url), receive, send)
+                second_done.set()
+
+            await asyncio.wait_for(asyncio.gather(
+                handler(http_scope(url), receive, slow_send), second()
+            ), timeout=5)
+            return sent
+
+        sent = asyncio.run(run())
+        self.assertEqual(sent[0]['status'], 200)
+
+    def test_disconnect(self):
+        """Ушедший до конца тела клиент не занимает поток"""
+        sent = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.handler(
+            http_scope('/', method='POST'), receive, send
+        ))
+        self.assertEqual(sent, [])
+
+
+class ASGIStreamingTests(TransactionTestCase):
+
+    def test_streaming(self):
+        """Потоковый ответ отдаётся из потока пула по частям"""
+        author = User.objects.create_user(username='writer')
+        Post.objects.create(text='Пост', author=author)
+        handler = ASGIHandler(max_workers=1)
+        self.addCleanup(handler.executor.shutdown)
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(handler(
+            http_scope(reverse('api:posts_export')), receive, send
+        ))
+        start, *body = sent
+        self.assertEqual(start['status'], 200)
+        self.assertTrue(body[0].get('more_body'))
+        self.assertFalse(body[-1].get('more_body'))
@@ -0,0 +1,71 @@
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import CountingCache, cache_settings
+from posts import feed_cache
+
+
+class CacheSettingsTests(SimpleTestCase):
+
+    def test_backend_from_environment(self):
+        """Бэкенд кеша выбирается переменной YATUBE_CACHE"""
+        backends = {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+            'sqlite': 'django.core.cache.backends.db.DatabaseCache',
+        }
+        for name, backend in backends.items():
+            with self.subTest(name=name):
+                config = cache_settings('/srv', {'YATUBE_CACHE': name})
+                self.assertEqual(config['default']['BACKEND'], backend)
+        config = cache_settings('/srv', {'YATUBE_CACHE': 'file'})
+        self.assertEqual(config['default']['LOCATION'], '/srv/cache')
+        self.assertEqual(
+            cache_settings('/srv', {})['default']['BACKEND'],
+            backends['locmem']
+        )
+
+    def test_bad_configuration(self):
+        """Неизвестный бэкенд и redis без адреса не принимаются"""
+        for environ in ({'YATUBE_CACHE': 'memcached'},
+                        {'YATUBE_CACHE': 'redis'}):
+            with self.subTest(environ=environ):
+                with self.assertRaises(ImproperlyConfigured):
+                    cache_settings('/srv', environ)
+
+
+class CountingCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = CountingCache()
+        self.cache.clear()
+
+    def test_hits_and_misses(self):
+        """Прокси считает попадания и промахи чтения"""
+        self.cache.set('stored', None)
+        self.assertIsNone(self.cache.get('stored', 'default'))
+        self.assertEqual(self.cache.get('absent', 'default'), 'default')
+        self.cache.set('other', 1)
+        self.assertEqual(
+            self.cache.get_many(['other', 'absent']), {'other': 1}
+        )
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 2))
+        self.cache.reset_stats()
+        self.assertEqual(self.cache.stats()['hits'], 0)
+
+    def test_process_local(self):
+        """Кеш в памяти процесса ограничивает жизнь страниц лент"""
+        with override_settings(CACHES=cache_settings(
+                '/srv', {'YATUBE_CACHE': 'locmem'})):
+            self.assertTrue(self.cache.process_local)
+            self.assertEqual(feed_cache.page_timeout(),
+                             feed_cache.LOCAL_FEED_CACHE_TIMEOUT)
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES=cache_settings(
+                    directory, {'YATUBE_CACHE': 'file'})):
+                self.assertFalse(self.cache.process_local)
+                self.assertEqual(feed_cache.page_timeout(),
+                                 feed_cache.FEED_CACHE_TIMEOUT)
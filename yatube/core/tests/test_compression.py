@@ -0,0 +1,140 @@
+import gzip
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.http import Http404
+from django.template import Context, Engine
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from core import compression, static
+from posts.models import Post
+
+User = get_user_model()
+
+
+class CompressionTests(SimpleTestCase):
+    # Закрытие ответа шлёт request_finished, а тот проверяет
+    # соединения с базой
+    databases = {'default'}
+
+    def test_choose_encoding(self):
+        """Сжатие выбирается по q, q=0 запрещает его"""
+        choose = compression.choose_encoding
+        self.assertEqual(choose('gzip, deflate', ('br', 'gzip')), 'gzip')
+        self.assertEqual(choose('br;q=0.5, gzip', ('br', 'gzip')), 'gzip')
+        self.assertEqual(choose('gzip, br', ('br', 'gzip')), 'br')
+        self.assertEqual(choose('*', ('gzip',)), 'gzip')
+        self.assertIsNone(choose('gzip;q=0', ('gzip',)))
+        self.assertIsNone(choose('', ('gzip',)))
+
+    def test_minify_html(self):
+        """Из HTML уходят комментарии и отступы, а pre и script
+        остаются как есть"""
+        source = ('<div>\n    <!-- комментарий -->\n    <p>текст</p>\n'
+                  '</div>\n<pre>  a\n  b</pre>\n'
+                  '<script>\n  var a = 1;  // x\n</script>')
+        self.assertEqual(
+            compression.minify_html(source),
+            '<div> <p>текст</p> </div> <pre>  a\n  b</pre> '
+            '<script>\n  var a = 1;  // x\n</script>'
+        )
+
+    def test_minifying_loader(self):
+        """Шаблоны проекта загружаются уже без комментариев"""
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'page.html'), 'w') as file:
+                file.write('<p>\n  <!-- убрать -->\n  {{ value }}\n</p>')
+            engine = Engine(dirs=[directory],
+                            loaders=['core.loaders.MinifyingLoader'])
+            self.assertEqual(
+                engine.get_template('page.html').render(
+                    Context({'value': 1})
+                ),
+                '<p> 1 </p>'
+            )
+
+    def test_precompress_and_serve(self):
+        """compress_static кладёт .gz рядом с файлом, а отдаётся он
+        только клиенту, который принимает gzip"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'app.css')
+            content = b'body { margin: 0; }\n' * 100
+            with open(path, 'wb') as file:
+                file.write(content)
+            factory = RequestFactory()
+            with override_settings(STATICFILES_DIRS=[directory]):
+                written = static.precompress(path)
+                self.assertIn(('gzip', len(content),
+                               os.path.getsize(path + '.gz')), written)
+                response = static.serve(
+                    factory.get('/', HTTP_ACCEPT_ENCODING='gzip'), 'app.css'
+                )
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(response['Content-Type'], 'text/css')
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(
+                    gzip.decompress(b''.join(response.streaming_content)),
+                    content
+                )
+                response = static.serve(factory.get('/'), 'app.css')
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(b''.join(response.streaming_content),
+                                 content)
+                with self.assertRaises(Http404):
+                    static.serve(factory.get('/'), 'app.css.gz')
+                # Правленый файл новее копии: копия не отдаётся
+                stat = os.stat(path + '.gz')
+                os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+                response = static.serve(
+                    factory.get('/', HTTP_ACCEPT_ENCODING='gzip'), 'app.css'
+                )
+                response.close()
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class CompressionMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(text=f'Пост номер {number}', author=cls.user)
+            for number in range(15)
+        )
+
+    def test_html_is_compressed(self):
+        """Большая страница сжимается в gzip, ETag становится слабым"""
+        plain = self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(int(response['Content-Length']),
+                         len(response.content))
+        if response.has_header('ETag'):
+            self.assertTrue(response['ETag'].startswith('W/'))
+
+    def test_small_response_is_not_compressed(self):
+        """Ответ короче порога отдаётся без сжатия"""
+        with override_settings(COMPRESS_MIN_SIZE=10 ** 6):
+            response = self.client.get(reverse('posts:index'),
+                                       HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_streaming_export_is_compressed(self):
+        """Потоковая выгрузка сжимается по частям"""
+        response = self.client.get(reverse('api:posts_export'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        lines = gzip.decompress(
+            b''.join(response.streaming_content)
+        ).splitlines()
+        self.assertEqual(len(lines), 15)
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import registry
+from posts.models import Post
+
+User = get_user_model()
+
+
+class InstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.staff = User.objects.create_user(username='admin',
+                                             is_staff=True)
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def test_server_timing(self):
+        """Ответ несёт время SQL, шаблонов и попадания в кеш"""
+        timing = self.client.get(reverse('posts:index'))['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('cache;desc="hits=', timing)
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    def test_metrics_endpoint(self):
+        """Сводка копится по имени URL и закрыта от посторонних"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.force_login(self.staff)
+        views = self.client.get(reverse('metrics')).json()['views']
+        self.assertEqual(views['posts:index']['requests'], 2)
+        self.assertEqual(
+            sum(views['posts:index']['buckets'].values()), 2
+        )
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.client.get(reverse('metrics')).status_code, 404
+        )
+
+    def test_metrics_ignores_internal_ips(self):
+        """Адрес из INTERNAL_IPS не открывает сводку: за прокси
+        он у всех запросов одинаковый"""
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(SLOW_REQUEST_MS=0, SLOW_REQUEST_SAMPLE_RATE=1.0)
+    def test_slow_request_logged(self):
+        """Медленный запрос пишется в лог вместе с его SQL"""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertIn('posts_post', logs.output[0])
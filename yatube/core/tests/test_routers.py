@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.db import DatabaseCache
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from sorl.thumbnail.models import KVStore
+
+from core import routers
+from core.management.commands.replicate_sqlite import copy_database
+from core.middleware import ReplicaMiddleware
+from posts.conditional import primary_condition
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        routers.finish_request()
+
+    def test_reads_go_to_replicas_in_requests(self):
+        """В запросе чтение идёт с реплики, вне запроса - с default"""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        routers.start_request(pinned=False)
+        self.assertIn(self.router.db_for_read(Post), ('replica1', 'replica2'))
+
+    def test_read_your_writes(self):
+        """После записи и с cookie закрепления чтение идёт с default"""
+        routers.start_request(pinned=False)
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertTrue(routers.finish_request())
+        routers.start_request(pinned=True)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_primary_reads(self):
+        """Кеш лент и блок primary() читаются только с default"""
+        routers.start_request(pinned=False)
+        cache_model = DatabaseCache('yatube_cache', {}).cache_model_class
+        self.assertEqual(self.router.db_for_read(cache_model), 'default')
+        with routers.primary():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        routers.finish_request()
+        routers.start_request(pinned=False)
+        with routers.primary():
+            pass
+        self.assertIn(self.router.db_for_read(Post), ('replica1', 'replica2'))
+
+    def test_service_writes_do_not_pin(self):
+        """Запись в кеш и хранилище миниатюр не закрепляет за default"""
+        cache_model = DatabaseCache('yatube_cache', {}).cache_model_class
+        routers.start_request(pinned=False)
+        for model in (cache_model, KVStore):
+            self.assertEqual(self.router.db_for_write(model), 'default')
+        self.assertIn(self.router.db_for_read(Post), ('replica1', 'replica2'))
+        self.assertFalse(routers.finish_request())
+
+    def test_conditional_view_reads_primary(self):
+        """Страница с ETag читается с той же базы, что и ETag"""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        routers.start_request(pinned=False)
+        primary_condition(lambda request: None)(view)(
+            RequestFactory().get('/')
+        )
+        self.assertEqual(seen, ['default'])
+
+    def test_replica_settings(self):
+        """YATUBE_DB_REPLICAS задаёт число реплик-зеркал"""
+        databases = routers.replica_databases(
+            '/srv', {'YATUBE_DB_REPLICAS': '2'}
+        )
+        self.assertEqual(list(databases), ['replica1', 'replica2'])
+        self.assertEqual(databases['replica1']['NAME'],
+                         '/srv/db.replica1.sqlite3')
+        self.assertEqual(databases['replica2']['TEST'],
+                         {'MIRROR': 'default'})
+        self.assertEqual(routers.replica_databases('/srv', {}), {})
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_pin_cookie_after_write(self):
+        """Запись закрепляет пользователя за основной базой"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(ReplicaMiddleware.cookie_name, response.cookies)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        self.assertIn(ReplicaMiddleware.cookie_name, response.cookies)
+
+
+class ReplicateCommandTests(SimpleTestCase):
+
+    def test_copy_database(self):
+        """Реплика получает содержимое основной базы"""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            with sqlite3.connect(source) as primary:
+                primary.execute('CREATE TABLE post (text TEXT)')
+                primary.execute("INSERT INTO post VALUES ('пост')")
+            primary.close()
+            copy_database(source, target)
+            replica = sqlite3.connect(target)
+            self.assertEqual(
+                replica.execute('SELECT text FROM post').fetchall(),
+                [('пост',)],
+            )
+            replica.close()
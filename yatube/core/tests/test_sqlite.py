@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+
+class SqliteProfileTests(SimpleTestCase):
+    # Тесты открывают собственные соединения с базой
+    databases = {'default'}
+
+    def pragmas(self, production):
+        """Прагмы нового соединения с временным файлом базы."""
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = dict(
+                connection.settings_dict,
+                NAME=os.path.join(directory, 'db.sqlite3'),
+            )
+            wrapper = DatabaseWrapper(settings_dict, alias='pragmas')
+            try:
+                with override_settings(SQLITE_PRODUCTION=production):
+                    wrapper.ensure_connection()
+                with wrapper.cursor() as cursor:
+                    return {
+                        name: cursor.execute(
+                            f'PRAGMA {name}'
+                        ).fetchone()[0]
+                        for name in ('journal_mode', 'synchronous',
+                                     'busy_timeout', 'mmap_size')
+                    }
+            finally:
+                wrapper.close()
+
+    def test_production_pragmas(self):
+        """В профиле production соединение открывается в режиме WAL"""
+        pragmas = self.pragmas(production=True)
+        self.assertEqual(pragmas['journal_mode'], 'wal')
+        # NORMAL
+        self.assertEqual(pragmas['synchronous'], 1)
+        self.assertEqual(pragmas['busy_timeout'], 5000)
+        self.assertGreater(pragmas['mmap_size'], 0)
+
+    def test_default_profile_untouched(self):
+        """Без профиля production прагмы SQLite по умолчанию"""
+        self.assertEqual(
+            self.pragmas(production=False)['journal_mode'], 'delete'
+        )
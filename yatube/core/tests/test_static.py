@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import static
+
+
+class ManifestStaticTests(SimpleTestCase):
+    # Закрытие ответа шлёт request_finished, а тот проверяет
+    # соединения с базой
+    databases = {'default'}
+
+    def test_collectstatic(self):
+        """collectstatic даёт имена с хешем, сжатые копии к ним
+        и годовой кеш для файлов с хешем"""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                STATIC_ROOT=directory,
+                STATICFILES_STORAGE=(
+                    'core.static.CompressedManifestStaticFilesStorage'
+                ),
+            ):
+                call_command('collectstatic', interactive=False,
+                             verbosity=0)
+                hashed = staticfiles_storage.stored_name(
+                    'css/bootstrap.min.css'
+                )
+                self.assertRegex(hashed,
+                                 r'^css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+                self.assertTrue(
+                    os.path.exists(os.path.join(directory, hashed + '.gz'))
+                )
+                self.assertEqual(
+                    Template(
+                        "{% load static %}{% static 'css/bootstrap.min.css' %}"
+                    ).render(Context()),
+                    '/static/' + hashed
+                )
+                factory = RequestFactory()
+                response = static.serve(
+                    factory.get('/', HTTP_ACCEPT_ENCODING='gzip'), hashed
+                )
+                response.close()
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(response['Cache-Control'],
+                                 'public, max-age=31536000, immutable')
+                response = static.serve(factory.get('/'),
+                                        'css/bootstrap.min.css')
+                response.close()
+                self.assertEqual(response['Cache-Control'],
+                                 'public, max-age=3600')
+
+    def test_base_template_uses_static(self):
+        """Стили и иконки base.html подключаются через {% static %}"""
+        with open(os.path.join(settings.BASE_DIR,
+                               'templates', 'base.html')) as file:
+            source = file.read()
+        self.assertNotRegex(source, r'href="(?!\{% static )')
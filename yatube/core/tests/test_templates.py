@@ -0,0 +1,59 @@
+import io
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from core.templates import template_settings, warm, warm_on_startup
+
+
+class TemplateProfileTests(SimpleTestCase):
+
+    def test_profiles(self):
+        """В production шаблоны грузит кешируемый загрузчик"""
+        default, = template_settings('/app', {})
+        self.assertTrue(default['APP_DIRS'])
+        self.assertNotIn('loaders', default['OPTIONS'])
+        production, = template_settings(
+            '/app', {'YATUBE_TEMPLATE_PROFILE': 'production'}
+        )
+        self.assertFalse(production['APP_DIRS'])
+        self.assertFalse(production['OPTIONS']['debug'])
+        loader, loaders = production['OPTIONS']['loaders'][0]
+        self.assertEqual(loader, 'django.template.loaders.cached.Loader')
+        # Шаблоны приложений (admin, debug_toolbar) по-прежнему находятся
+        self.assertIn('django.template.loaders.app_directories.Loader',
+                      loaders)
+
+    def test_project_templates(self):
+        """Все шаблоны проекта разбираются без ошибок"""
+        count, errors = warm()
+        self.assertGreater(count, 0)
+        self.assertEqual(errors, [])
+        call_command('warm_templates', stdout=io.StringIO())
+
+    def test_broken_templates_stop_startup(self):
+        """Отсутствующий include и синтаксическая ошибка
+        останавливают запуск в профиле production"""
+        with tempfile.TemporaryDirectory() as base_dir:
+            directory = os.path.join(base_dir, 'templates')
+            os.mkdir(directory)
+            for name, content in (
+                ('page.html', "{% include 'missing.html' %}"),
+                ('broken.html', '{% if %}'),
+                ('ok.html', "{% include 'page.html' %}"),
+            ):
+                with open(os.path.join(directory, name), 'w') as file:
+                    file.write(content)
+            templates = template_settings(
+                base_dir, {'YATUBE_TEMPLATE_PROFILE': 'production'}
+            )
+            with override_settings(TEMPLATES=templates):
+                with self.assertRaises(ImproperlyConfigured) as error:
+                    warm_on_startup()
+        message = str(error.exception)
+        self.assertIn('page.html: нет шаблона missing.html', message)
+        self.assertIn('broken.html', message)
+        self.assertNotIn('ok.html', message)
@@ -1,5 +1,9 @@
+from django.http import Http404, JsonResponse
 from django.shortcuts import render
 
+from .cache import cache
+from .metrics import registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -7,3 +11,16 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Сводка замеров процесса: только для персонала.
+
+    INTERNAL_IPS не подходит: за обратным прокси REMOTE_ADDR у всех
+    запросов - адрес прокси."""
+    if not request.user.is_staff:
+        raise Http404
+    return JsonResponse({
+        'views': registry.snapshot(),
+        'cache': cache.stats(),
+    })
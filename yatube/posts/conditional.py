@@ -0,0 +1,114 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from core import routers
+
+from .feed_cache import get_generations
+from .models import Comment, Post, TimelineEntry
+
+# ETag страниц считается без рендеринга: из последней правки
+# и числа постов области плюс поколений кеша лент. Поколения
+# ловят смену имён авторов и групп, а данные из базы - правки
+# из процессов с отдельным кешем. Главная и лента подписок не
+# считают строки: только пробы по индексу, удаления ловят поколения.
+
+
+def make_etag(request, *parts):
+    """ETag зависит от пользователя и полного пути с курсором."""
+    user = request.user.pk if request.user.is_authenticated else 0
+    raw = '|'.join(
+        str(part) for part in (user, request.get_full_path(), *parts)
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed_version(posts):
+    """Последняя правка и число постов: удаление меняет число,
+    новый или изменённый пост - дату."""
+    version = posts.order_by().aggregate(
+        last=Max('updated'), total=Count('id')
+    )
+    return version['last'], version['total']
+
+
+def last_update():
+    """Последняя правка на сайте: одна проба по индексу updated."""
+    return Post.objects.order_by().aggregate(last=Max('updated'))['last']
+
+
+def index_etag(request):
+    return make_etag(request, last_update(), *get_generations(['index']))
+
+
+def group_etag(request, slug):
+    return make_etag(
+        request, *feed_version(Post.objects.filter(group__slug=slug)),
+        *get_generations([f'group:{slug}'])
+    )
+
+
+def profile_etag(request, username):
+    return make_etag(
+        request,
+        *feed_version(Post.objects.filter(author__username=username)),
+        *get_generations([f'author:{username}'])
+    )
+
+
+def post_etag(request, post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'author__username', 'group__slug'
+    ).first()
+    if post is None:
+        return None
+    updated, username, slug = post
+    comments = Comment.objects.filter(post_id=post_id).aggregate(
+        last=Max('id'), total=Count('id')
+    )
+    scopes = [f'author:{username}']
+    if slug:
+        scopes.append(f'group:{slug}')
+    return make_etag(
+        request, updated, comments['last'], comments['total'],
+        *get_generations(scopes)
+    )
+
+
+def follow_etag(request):
+    """Версия ленты подписок без JOIN подписок и постов: верх
+    материализованной ленты (индекс user, -pub_date), последняя
+    правка на сайте и поколения - всех постов и подписок читателя."""
+    if not request.user.is_authenticated:
+        return None
+    top = TimelineEntry.objects.filter(user=request.user).order_by(
+        '-pub_date', '-post_id'
+    ).values_list('pub_date', 'post_id').first()
+    return make_etag(
+        request, top, last_update(),
+        *get_generations(['index', f'follow:{request.user.pk}'])
+    )
+
+
+def primary_condition(etag_func):
+    """condition(), при котором и ETag, и сама страница читаются
+    с основной базы: свежий ETag у страницы с отстающей реплики
+    закрепил бы у клиента старую страницу до следующей правки."""
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with routers.primary():
+                return conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+index_condition = primary_condition(index_etag)
+group_condition = primary_condition(group_etag)
+profile_condition = primary_condition(profile_etag)
+post_condition = primary_condition(post_etag)
+follow_condition = primary_condition(follow_etag)
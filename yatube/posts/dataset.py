@@ -0,0 +1,182 @@
+import datetime
+import json
+import time
+from contextlib import contextmanager
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+
+from core.cache import cache
+
+from . import search, stats, timeline
+from .models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+DATASET_BATCH_SIZE = 1000
+
+# Модели выгрузки в порядке загрузки: ссылки идут только
+# на модели выше по списку
+DATASET = (
+    ('users', User, (
+        'id', 'username', 'password', 'first_name', 'last_name', 'email',
+        'is_active', 'is_staff', 'is_superuser', 'last_login', 'date_joined',
+    )),
+    ('groups', Group, ('id', 'title', 'slug', 'description')),
+    ('posts', Post, (
+        'id', 'text', 'pub_date', 'updated', 'author_id', 'group_id', 'image',
+    )),
+    ('comments', Comment, ('id', 'post_id', 'author_id', 'text', 'created')),
+    ('follows', Follow, ('id', 'user_id', 'author_id')),
+)
+MODELS = {name: model for name, model, _ in DATASET}
+
+
+class DatasetEncoder(DjangoJSONEncoder):
+    """Даты с микросекундами: DjangoJSONEncoder округляет
+    до миллисекунд, а курсоры лент сравнивают точные значения."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export(stream, batch_size=DATASET_BATCH_SIZE):
+    """Пишет данные в stream построчно в NDJSON.
+    Строки читаются пачками по первичному ключу, память не растёт
+    с размером базы. Для каждой модели отдаёт (имя, строк, секунд)."""
+    for name, model, fields in DATASET:
+        started = time.monotonic()
+        count = 0
+        last = 0
+        while True:
+            rows = list(model.objects.filter(pk__gt=last).order_by(
+                'pk'
+            ).values(*fields)[:batch_size])
+            if not rows:
+                break
+            stream.write(''.join(
+                json.dumps({'model': name, 'fields': row},
+                           cls=DatasetEncoder, ensure_ascii=False) + '\n'
+                for row in rows
+            ))
+            last = rows[-1]['id']
+            count += len(rows)
+        yield name, count, time.monotonic() - started
+
+
+def load(lines, batch_size=DATASET_BATCH_SIZE, resume=False):
+    """Загружает NDJSON из итератора строк через bulk_create.
+
+    Каждая пачка - отдельная транзакция, строки идут по возрастанию
+    ключа, поэтому после сбоя resume=True пропускает всё,
+    что не больше последнего загруженного ключа модели.
+    bulk_create не шлёт сигналов: производные данные потом
+    строит rebuild_derived(). Для каждой модели отдаёт
+    (имя, строк, секунд)."""
+    records = (json.loads(line) for line in lines if line.strip())
+    for name, group in groupby(records, key=itemgetter('model')):
+        if name not in MODELS:
+            raise ValueError(f'Неизвестная модель в выгрузке: {name}')
+        model = MODELS[name]
+        loaded = 0
+        if resume:
+            loaded = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        objects = (model(**record['fields']) for record in group
+                   if record['fields']['id'] > loaded)
+        started = time.monotonic()
+        count = 0
+        with preserved_timestamps(model):
+            while True:
+                batch = list(islice(objects, batch_size))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    model.objects.bulk_create(batch)
+                count += len(batch)
+        yield name, count, time.monotonic() - started
+    reset_sequences()
+
+
+@contextmanager
+def preserved_timestamps(model):
+    """auto_now и auto_now_add затёрли бы даты из выгрузки."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False)
+              or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def deferred_indexes():
+    """Снимает индексы из Meta.indexes на время загрузки:
+    одна сборка индекса в конце дешевле обновления на каждой
+    вставке. Уникальные ограничения остаются."""
+    models = list(MODELS.values()) + [TimelineEntry]
+    with connection.schema_editor() as editor:
+        for model in models:
+            existing = existing_constraints(model)
+            for index in model._meta.indexes:
+                if index.name in existing:
+                    editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model in models:
+                existing = existing_constraints(model)
+                for index in model._meta.indexes:
+                    if index.name not in existing:
+                        editor.add_index(model, index)
+
+
+def existing_constraints(model):
+    with connection.cursor() as cursor:
+        return connection.introspection.get_constraints(
+            cursor, model._meta.db_table
+        )
+
+
+def reset_sequences():
+    """Счётчики автоинкремента после вставки с явными ключами."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), list(MODELS.values())
+    )
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def rebuild_derived():
+    """Счётчики, ленты подписок, поиск, статистика планировщика
+    и кеш лент после загрузки."""
+    with transaction.atomic():
+        stats.rebuild()
+    with transaction.atomic():
+        timeline.rebuild()
+    with transaction.atomic():
+        search.rebuild()
+    analyze()
+    cache.clear()
+
+
+def analyze():
+    """Статистика таблиц для планировщика SQLite; по ней же
+    paginator.estimated_count оценивает число постов."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
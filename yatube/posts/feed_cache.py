@@ -0,0 +1,121 @@
+import hashlib
+import time
+from functools import wraps
+
+from core import routers
+from core.cache import cache
+
+# Страница живёт долго: устаревшей её делает смена поколения, а не TTL
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# С кешем в памяти процесса смена поколения видна только воркеру,
+# принявшему запись: остальные держат страницу не дольше этого
+LOCAL_FEED_CACHE_TIMEOUT = 20
+# Сколько держится блокировка перестроения страницы
+FEED_LOCK_TIMEOUT = 10
+# Сколько ждать чужого перестроения, если старой копии нет
+FEED_LOCK_WAIT = 2
+FEED_LOCK_POLL = 0.05
+
+
+def generation_key(scope):
+    return f'feed:generation:{scope}'
+
+
+def get_generations(scopes):
+    """Текущие поколения областей ленты. Отсутствующее поколение
+    заводится от текущего времени, чтобы после вытеснения ключа
+    не совпасть со старыми страницами."""
+    keys = [generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+def bump(*scopes):
+    """Делает устаревшими все закешированные страницы областей."""
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def post_scopes(post, *group_slugs):
+    """Области ленты, в которые попадает пост."""
+    scopes = ['index', f'author:{post.author.username}']
+    if post.group_id:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes + [f'group:{slug}' for slug in group_slugs]
+
+
+def page_timeout():
+    if cache.process_local:
+        return LOCAL_FEED_CACHE_TIMEOUT
+    return FEED_CACHE_TIMEOUT
+
+
+def page_key(request):
+    user = request.user.pk if request.user.is_authenticated else 0
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'feed:page:{user}:{digest}'
+
+
+def feed_cache(*scopes):
+    """Кеширует страницу ленты до смены поколения её областей.
+
+    scopes - шаблоны имён областей, подставляются из kwargs view,
+    например 'group:{slug}'. Страницу перестраивает один запрос,
+    остальные получают предыдущую копию или ждут перестроения.
+    Страница читается с основной базы: иначе копия с отстающей
+    реплики легла бы в кеш под новым поколением.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            with routers.primary():
+                return _cached_response(view, scopes, request,
+                                        *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _cached_response(view, scopes, request, *args, **kwargs):
+    generations = get_generations(
+        [scope.format(**kwargs) for scope in scopes]
+    )
+    key = page_key(request)
+    entry = cache.get(key)
+    if entry and entry[0] == generations:
+        return entry[1]
+    lock = f'{key}:lock'
+    locked = cache.add(lock, 1, FEED_LOCK_TIMEOUT)
+    if not locked:
+        if entry:
+            return entry[1]
+        entry = _wait_for(key, generations)
+        if entry:
+            return entry[1]
+    try:
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.cookies:
+            cache.set(key, (generations, response), page_timeout())
+    finally:
+        if locked:
+            cache.delete(lock)
+    return response
+
+
+def _wait_for(key, generations):
+    deadline = time.monotonic() + FEED_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(FEED_LOCK_POLL)
+        entry = cache.get(key)
+        if entry and entry[0] == generations:
+            return entry
+    return None
@@ -0,0 +1,132 @@
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from . import conditional
+from .feed_cache import feed_cache
+from .models import FEED_FIELDS, Group, Post, User
+
+FEED_ITEMS = 20
+FEED_TITLE_WORDS = 10
+
+
+class LatestPostsFeed(Feed):
+    """RSS последних постов сайта."""
+
+    title = 'YaTube: последние записи'
+    description = 'Последние обновления на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.select_related('author', 'group').only(
+            *FEED_FIELDS, 'updated'
+        )
+
+    def items(self, obj):
+        return self.posts(obj)[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(FEED_TITLE_WORDS)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_author_link(self, item):
+        return reverse('posts:profile', args=[item.author.username])
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    """RSS постов группы."""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'YaTube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def posts(self, obj):
+        return super().posts(obj).filter(group=obj)
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    """RSS постов автора."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'YaTube: {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Все посты пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def posts(self, obj):
+        return super().posts(obj).filter(author=obj)
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return obj.description
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def cached_feed(scope, condition, feed):
+    """Лента живёт в кеше до смены поколения области: сохранение
+    и удаление поста меняют его в сигналах. ETag тот же, что у
+    HTML-ленты: поколения плюс последняя правка из базы, которая
+    видна и при отдельном кеше в каждом процессе. Опрос без
+    изменений стоит пробы по индексу и ответа 304."""
+    return condition(feed_cache(scope)(feed))
+
+
+index_rss = cached_feed(
+    'index', conditional.index_condition, LatestPostsFeed())
+index_atom = cached_feed(
+    'index', conditional.index_condition, LatestPostsAtomFeed())
+group_rss = cached_feed(
+    'group:{slug}', conditional.group_condition, GroupPostsFeed())
+group_atom = cached_feed(
+    'group:{slug}', conditional.group_condition, GroupPostsAtomFeed())
+author_rss = cached_feed(
+    'author:{username}', conditional.profile_condition, AuthorPostsFeed())
+author_atom = cached_feed(
+    'author:{username}', conditional.profile_condition,
+    AuthorPostsAtomFeed())
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts import dataset
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии '
+            'и подписки в NDJSON, построчно и пачками')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output', default='-',
+            help='Файл выгрузки, по умолчанию stdout',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=dataset.DATASET_BATCH_SIZE,
+            help='Сколько строк читать из базы за запрос',
+        )
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            self.dump(self.stdout, options['batch_size'])
+            return
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            self.dump(stream, options['batch_size'])
+
+    def dump(self, stream, batch_size):
+        # Отчёт в stderr: stdout может быть самой выгрузкой
+        for name, count, seconds in dataset.export(stream, batch_size):
+            self.stderr.write(report(name, count, seconds))
+
+
+def report(name, count, seconds):
+    return f'{name}: {count} строк, {count / max(seconds, 1e-6):.0f} строк/с'
@@ -0,0 +1,60 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import dataset
+
+from .export_yatube import report
+
+
+class Command(BaseCommand):
+    help = ('Загружает NDJSON-выгрузку export_yatube через bulk_create, '
+            'затем пересчитывает счётчики, ленты и поисковый индекс')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл выгрузки, - для stdin',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=dataset.DATASET_BATCH_SIZE,
+            help='Сколько строк вставлять за транзакцию',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную загрузку того же файла',
+        )
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help='Не снимать индексы на время загрузки',
+        )
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            self.load(sys.stdin, options)
+            return
+        with open(options['path'], encoding='utf-8') as stream:
+            self.load(stream, options)
+
+    def load(self, stream, options):
+        rows = dataset.load(
+            stream, options['batch_size'], resume=options['resume']
+        )
+        try:
+            if options['keep_indexes']:
+                self.report(rows)
+            else:
+                with dataset.deferred_indexes():
+                    self.report(rows)
+        except (ValueError, KeyError, TypeError) as error:
+            if isinstance(error, json.JSONDecodeError):
+                error = f'Битая строка выгрузки: {error}'
+            raise CommandError(error)
+        dataset.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            'Счётчики, ленты подписок и поисковый индекс пересчитаны'
+        ))
+
+    def report(self, rows):
+        for name, count, seconds in rows:
+            self.stdout.write(report(name, count, seconds))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import stats
+from posts.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики AuthorStats по данным постов и подписок'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано авторов: {AuthorStats.objects.count()}'
+        ))
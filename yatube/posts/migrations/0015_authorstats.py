@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 01:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    counters = (
+        ('posts', apps.get_model('posts', 'Post'), 'author_id'),
+        ('followers', apps.get_model('posts', 'Follow'), 'author_id'),
+        ('following', apps.get_model('posts', 'Follow'), 'user_id'),
+        ('comments', apps.get_model('posts', 'Comment'), 'author_id'),
+    )
+    totals = {
+        counter: dict(model.objects.order_by().values_list(field).annotate(
+            total=models.Count('id')
+        ))
+        for counter, model, field in counters
+    }
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(author_id=author_id, **{
+            counter: totals[counter].get(author_id, 0)
+            for counter, _, _ in counters
+        }) for author_id in User.objects.values_list('id', flat=True)),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0014_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:10
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+SEARCH_TABLE = 'posts_search'
+
+
+def create_search_table(apps, schema_editor):
+    """Таблица FTS5 есть только в SQLite, собранном с FTS5.
+    Без неё поиск работает по индексу в памяти."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5('
+            f"body, kind UNINDEXED, post_id UNINDEXED, "
+            f"tokenize='unicode61')"
+        )
+    except OperationalError:
+        return
+    # rowid: id * 2 у постов, id * 2 + 1 у комментариев
+    schema_editor.execute(
+        f'INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id) '
+        f"SELECT id * 2, text, 'post', id FROM posts_post"
+    )
+    schema_editor.execute(
+        f'INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id) '
+        f"SELECT id * 2 + 1, text, 'comment', post_id FROM posts_comment"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
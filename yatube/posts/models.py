@@ -14,10 +14,34 @@ class Group(models.Model):
         return self.title
 
 
+# Колонки, которые выводят ленты и страница поста
+FEED_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'author_id', 'group_id',
+    'author__id', 'author__username',
+    'author__first_name', 'author__last_name',
+    'group__id', 'group__slug', 'group__title',
+)
+
+
+class PostQuerySet(models.QuerySet):
+
+    def feed(self):
+        """Автор и группа подтягиваются одним JOIN,
+        неиспользуемые колонки не читаются."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def with_author_stats(self):
+        """Лента плюс счётчики автора в том же запросе."""
+        return self.select_related(
+            'author__stats', 'group'
+        ).only(*FEED_FIELDS, 'author__stats__posts')
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name="Текст поста",
                             help_text='Введите текст поста')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -39,12 +63,30 @@ class Post(models.Model):
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         # выводим текст поста
         return self.text[:15]
 
     class Meta:
         ordering = ['-pub_date']
+        # Индексы под выборки лент: сортировка (pub_date, id)
+        # отдаётся индексом без сортировки после фильтра
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+            # Валидаторы условных запросов: последняя правка в области
+            models.Index(fields=['updated'], name='post_updated_idx'),
+            models.Index(fields=['author', 'updated'],
+                         name='post_author_updated_idx'),
+            models.Index(fields=['group', 'updated'],
+                         name='post_group_updated_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -68,6 +110,12 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -87,3 +135,55 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_author_user_following'
             )
         ]
+        # Обратный поиск: подписчики автора
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: строка на пару (читатель, пост).
+    Заполняется при публикации поста (fan-out on write),
+    pub_date копируется из поста, чтобы лента читалась одним
+    диапазоном по индексу (user, pub_date, post)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_user_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            )
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора.
+    Поддерживаются сигналами, пересчитываются командой
+    rebuild_author_stats."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts = models.PositiveIntegerField('Постов', default=0)
+    followers = models.PositiveIntegerField('Подписчиков', default=0)
+    following = models.PositiveIntegerField('Подписок', default=0)
+    comments = models.PositiveIntegerField('Комментариев', default=0)
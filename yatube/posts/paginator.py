@@ -0,0 +1,272 @@
+import base64
+import binascii
+import math
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import connections, router
+from django.db.models import Q
+
+from core.cache import cache
+
+# Направления перехода, зашитые в курсор; LAST - последняя страница
+NEXT = 'n'
+PREVIOUS = 'p'
+LAST = 'l'
+# Сколько живёт в кеше оценка числа строк из статистики
+ESTIMATE_TIMEOUT = 60 * 10
+# Целые в SQLite - знаковые 64-битные
+MIN_INTEGER = -2 ** 63
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def encode_cursor(direction, values):
+    """Кодирует направление и значения ключа в непрозрачный токен."""
+    raw = '|'.join([direction] + [_dump(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает токен курсора. Для битого токена возвращает None."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    direction, *values = raw.split('|')
+    if direction not in (NEXT, PREVIOUS, LAST):
+        return None
+    return direction, values
+
+
+def integer_in_range(value):
+    """Целое из курсора, которое примет база."""
+    return MIN_INTEGER <= value <= MAX_INTEGER
+
+
+def _dump(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class CursorPaginator(Paginator):
+    """Keyset-паджинатор: страница выбирается условием по ключу
+    сортировки, а не OFFSET, и не требует COUNT(*).
+
+    ordering - поля ключа в порядке выдачи, последнее поле должно
+    быть уникальным (обычно id), чтобы ключ однозначно задавал позицию.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id')):
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    def get_page(self, cursor):
+        """Возвращает страницу по токену курсора.
+        Пустой или некорректный токен ведёт на первую страницу."""
+        decoded = decode_cursor(cursor)
+        if decoded and decoded[0] == LAST:
+            return self._last_page()
+        values = decoded and self._load(decoded[1])
+        if not values:
+            return self._first_page()
+        if decoded[0] == PREVIOUS:
+            return self._previous_page(values)
+        items = self._fetch(values, forward=True, limit=self.per_page + 1)
+        return self._build(items[:self.per_page],
+                           has_previous=True,
+                           has_next=len(items) > self.per_page)
+
+    def _first_page(self):
+        items = self._fetch(None, forward=True, limit=self.per_page + 1)
+        return self._build(items[:self.per_page],
+                           has_previous=False,
+                           has_next=len(items) > self.per_page)
+
+    def _previous_page(self, values):
+        items = self._fetch(values, forward=False, limit=self.per_page + 1)
+        if len(items) <= self.per_page:
+            # Дошли до начала выдачи: отдаём полную первую страницу
+            return self._first_page()
+        items = items[:self.per_page]
+        items.reverse()
+        return self._build(items, has_previous=True, has_next=True)
+
+    def _last_page(self):
+        items = self._fetch(None, forward=False, limit=self.per_page + 1)
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page]
+        items.reverse()
+        return self._build(items, has_previous=has_previous, has_next=False)
+
+    def navigation(self, page, window, number=None, count=None):
+        """Ссылки навигации: первая, до window страниц в каждую
+        сторону и последняя. Курсоры соседних страниц берутся из ключей
+        соседних строк одним запросом на сторону, без COUNT(*).
+
+        number - номер текущей страницы из ссылки, по которой пришли;
+        без него выводятся только ближайшие страницы. count - оценка
+        числа объектов для номера последней страницы."""
+        items = list(page)
+        if not items or not (page.previous_cursor or page.next_cursor):
+            return []
+        if not page.previous_cursor:
+            number = 1
+        if number is None:
+            window = 1
+        links = []
+        if page.previous_cursor:
+            links.append(_link('first', None, None))
+            before = self._neighbours(items[0], False, window)
+            for step, values in reversed(list(enumerate(before, 1))):
+                if number is None or number - step > 1:
+                    links.append(_link('previous', number and number - step,
+                                       encode_cursor(PREVIOUS, values)))
+        links.append(_link('current', number, None))
+        if page.next_cursor:
+            after = self._neighbours(items[-1], True, window)
+            for step, values in enumerate(after, 1):
+                links.append(_link('next', number and number + step,
+                                   encode_cursor(NEXT, values)))
+            # Номер последней страницы - только оценка, в ссылку
+            # он не передаётся
+            last = _link('last', None, encode_cursor(LAST, []))
+            if count is not None:
+                last['estimate'] = max(
+                    math.ceil(count / self.per_page), number or 1
+                )
+            links.append(last)
+        return links
+
+    def _neighbours(self, item, forward, window):
+        """Ключи, с которых начинаются до window соседних страниц
+        в сторону forward от item."""
+        key = self._key(item)
+        if window == 1:
+            return [key]
+        if not forward:
+            # Курсор PREVIOUS берёт страницу перед первой строкой
+            # следующей за ней страницы
+            rows = self._keys(key, forward, self.per_page * (window - 1))
+            return [key] + rows[self.per_page - 1::self.per_page]
+        # Страница k начинается после последней строки страницы k - 1
+        rows = self._keys(key, forward, self.per_page * (window - 1) + 1)
+        return [key] + [rows[position - 1] for position in range(
+            self.per_page, len(rows), self.per_page
+        )]
+
+    def _keys(self, values, forward, limit):
+        if limit <= 0:
+            return []
+        return [list(row) for row in self.keyset(
+            self.object_list, values, forward
+        ).values_list(*self.fields)[:limit]]
+
+    def _build(self, items, has_previous, has_next):
+        page = Page(items, None, self)
+        page.previous_cursor = None
+        page.next_cursor = None
+        if items and has_previous:
+            page.previous_cursor = encode_cursor(
+                PREVIOUS, self._key(items[0]))
+        if items and has_next:
+            page.next_cursor = encode_cursor(NEXT, self._key(items[-1]))
+        return page
+
+    def _fetch(self, values, forward, limit):
+        """Первые limit объектов после ключа values (forward=True)
+        или перед ним; ближайшие к ключу идут первыми."""
+        return list(self.keyset(self.object_list, values, forward)[:limit])
+
+    def keyset(self, queryset, values, forward):
+        """Упорядочивает queryset по ключу и отсекает всё до values."""
+        if not forward:
+            queryset = queryset.order_by(
+                *[self._reverse(field) for field in self.ordering])
+        if values is None:
+            return queryset
+        return queryset.filter(self._keyset_q(values, after=forward))
+
+    def _keyset_q(self, values, after):
+        """Строит условие (a, b) > (x, y) с учётом направления полей:
+        a > x OR (a = x AND b > y)."""
+        condition = Q()
+        for position in reversed(range(len(self.ordering))):
+            field = self.ordering[position]
+            descending = field.startswith('-')
+            lookup = 'lt' if descending == after else 'gt'
+            name = self.fields[position]
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            if position < len(self.ordering) - 1:
+                step |= Q(**{name: values[position]}) & condition
+            condition = step
+        return condition
+
+    def _key(self, item):
+        if isinstance(item, dict):
+            return [item[field] for field in self.fields]
+        return [getattr(item, field) for field in self.fields]
+
+    def _load(self, raw_values):
+        if len(raw_values) != len(self.fields):
+            return None
+        model = self.object_list.model
+        values = []
+        for name, raw in zip(self.fields, raw_values):
+            try:
+                value = model._meta.get_field(name).to_python(raw)
+            except (ValidationError, OverflowError, ValueError):
+                return None
+            if value is None:
+                return None
+            if isinstance(value, int) and not integer_in_range(value):
+                return None
+            values.append(value)
+        return values
+
+    @staticmethod
+    def _reverse(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+
+def _link(kind, number, cursor):
+    return {'kind': kind, 'number': number, 'cursor': cursor}
+
+
+def estimated_count(model):
+    """Оценка числа строк таблицы по статистике ANALYZE вместо
+    COUNT(*). Только для всей таблицы: для значения поля
+    статистика знает лишь среднее по всем значениям. None, если
+    статистики нет. Оценка кешируется на ESTIMATE_TIMEOUT."""
+    key = f'estimate:{model._meta.db_table}'
+    estimate = cache.get(key)
+    if estimate is None:
+        estimate = _sqlite_estimate(model)
+        cache.set(key, estimate if estimate is not None else -1,
+                  ESTIMATE_TIMEOUT)
+    return None if estimate is None or estimate < 0 else estimate
+
+
+def _sqlite_estimate(model):
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master "
+                       "WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            # ANALYZE ещё не запускали
+            return None
+        # Строк в sqlite_stat1 по одной на индекс, читаем все
+        cursor.execute('SELECT tbl, stat FROM sqlite_stat1')
+        rows = cursor.fetchall()
+    # Первое число stat - строк в таблице
+    for table, stat in rows:
+        if table == model._meta.db_table:
+            return int(stat.split()[0])
+    return None
@@ -0,0 +1,263 @@
+import html
+import re
+import threading
+from collections import defaultdict
+from math import isfinite, log
+
+from django.db import connection
+from django.utils.safestring import mark_safe
+
+from .paginator import NEXT, decode_cursor, encode_cursor, integer_in_range
+
+# Виртуальная таблица FTS5, создаётся миграцией 0017_search
+SEARCH_TABLE = 'posts_search'
+# Сколько слов показывать во фрагменте с подсветкой
+SNIPPET_TOKENS = 12
+# Маркеры подсветки: текст экранируется уже после snippet()
+MARK_OPEN, MARK_CLOSE = '\x02', '\x03'
+WORD = re.compile(r'\w+')
+
+POST = 'post'
+COMMENT = 'comment'
+
+
+def rowid(kind, object_id):
+    """Посты и комментарии делят одну таблицу: чётные rowid у постов,
+    нечётные у комментариев."""
+    return object_id * 2 + (kind == COMMENT)
+
+
+def terms(query):
+    return [word.lower() for word in WORD.findall(query)]
+
+
+def highlight(fragment):
+    return mark_safe(
+        html.escape(fragment)
+        .replace(MARK_OPEN, '<mark>')
+        .replace(MARK_CLOSE, '</mark>')
+    )
+
+
+class FTS5Index:
+    """Полнотекстовый индекс SQLite FTS5. rank - bm25, чем меньше,
+    тем релевантнее."""
+
+    def __init__(self):
+        self._available = None
+
+    def available(self):
+        if self._available is None:
+            self._available = (
+                connection.vendor == 'sqlite'
+                and SEARCH_TABLE in connection.introspection.table_names()
+            )
+        return self._available
+
+    def add(self, kind, object_id, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [rowid(kind, object_id)]
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id) '
+                f'VALUES (%s, %s, %s, %s)',
+                [rowid(kind, object_id), text, kind, post_id]
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [rowid(kind, object_id)]
+            )
+
+    def rebuild(self):
+        from .models import Comment, Post
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id) '
+                f"SELECT id * 2, text, '{POST}', id "
+                f'FROM {Post._meta.db_table}'
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, body, kind, post_id) '
+                f"SELECT id * 2 + 1, text, '{COMMENT}', post_id "
+                f'FROM {Comment._meta.db_table}'
+            )
+
+    def search(self, words, after, limit):
+        match = ' '.join('"{}"'.format(word) for word in words)
+        sql = (
+            f'SELECT rowid, kind, post_id, '
+            f"snippet({SEARCH_TABLE}, 0, %s, %s, '…', %s), rank "
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+        )
+        params = [MARK_OPEN, MARK_CLOSE, SNIPPET_TOKENS, match]
+        if after:
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY rank, rowid LIMIT %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+
+class InvertedIndex:
+    """Запасной индекс в памяти процесса для баз без FTS5.
+    Строится из базы при первом поиске, дальше обновляется
+    теми же сигналами. rank - минус TF-IDF."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = None
+        self.documents = {}
+
+    def add(self, kind, object_id, post_id, text):
+        with self._lock:
+            if self.postings is not None:
+                self._add(rowid(kind, object_id), kind, post_id, text)
+
+    def remove(self, kind, object_id):
+        with self._lock:
+            if self.postings is not None:
+                self._remove(rowid(kind, object_id))
+
+    def rebuild(self):
+        with self._lock:
+            self.postings = None
+            self.documents = {}
+
+    def search(self, words, after, limit):
+        with self._lock:
+            if self.postings is None:
+                self._build()
+            found = None
+            for word in words:
+                matches = set(self.postings.get(word, ()))
+                found = matches if found is None else found & matches
+            scores = []
+            for key in found or ():
+                rank = -sum(
+                    self.postings[word][key] * log(
+                        1 + len(self.documents) / len(self.postings[word])
+                    ) for word in words
+                )
+                scores.append((rank, key))
+        scores.sort()
+        if after:
+            scores = [item for item in scores if item > tuple(after)]
+        return [
+            (key, self.documents[key][0], self.documents[key][1],
+             self._snippet(self.documents[key][2], words), rank)
+            for rank, key in scores[:limit]
+        ]
+
+    def _build(self):
+        from .models import Comment, Post
+
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        for object_id, text in Post.objects.values_list(
+                'id', 'text').iterator():
+            self._add(rowid(POST, object_id), POST, object_id, text)
+        for object_id, post_id, text in Comment.objects.values_list(
+                'id', 'post_id', 'text').iterator():
+            self._add(rowid(COMMENT, object_id), COMMENT, post_id, text)
+
+    def _add(self, key, kind, post_id, text):
+        self._remove(key)
+        self.documents[key] = (kind, post_id, text)
+        for word in terms(text):
+            self.postings[word][key] = self.postings[word].get(key, 0) + 1
+
+    def _remove(self, key):
+        document = self.documents.pop(key, None)
+        if document is None:
+            return
+        for word in set(terms(document[2])):
+            self.postings[word].pop(key, None)
+            if not self.postings[word]:
+                del self.postings[word]
+
+    @staticmethod
+    def _snippet(text, words):
+        tokens = text.split()
+        first = next((position for position, token in enumerate(tokens)
+                      if set(terms(token)) & set(words)), 0)
+        start = max(first - SNIPPET_TOKENS // 2, 0)
+        fragment = tokens[start:start + SNIPPET_TOKENS]
+        marked = [
+            f'{MARK_OPEN}{token}{MARK_CLOSE}'
+            if set(terms(token)) & set(words) else token
+            for token in fragment
+        ]
+        prefix = '…' if start else ''
+        suffix = '…' if start + SNIPPET_TOKENS < len(tokens) else ''
+        return prefix + ' '.join(marked) + suffix
+
+
+fts5_index = FTS5Index()
+memory_index = InvertedIndex()
+
+
+def get_index():
+    return fts5_index if fts5_index.available() else memory_index
+
+
+def rebuild():
+    """Перестраивает индекс целиком, например после загрузки
+    данных в обход сигналов."""
+    get_index().rebuild()
+
+
+def index_post(post):
+    get_index().add(POST, post.pk, post.pk, post.text)
+
+
+def index_comment(comment):
+    get_index().add(COMMENT, comment.pk, comment.post_id, comment.text)
+
+
+def unindex_post(post):
+    get_index().remove(POST, post.pk)
+
+
+def unindex_comment(comment):
+    get_index().remove(COMMENT, comment.pk)
+
+
+def search_posts(query, cursor, limit):
+    """Страница результатов поиска: список словарей с постом,
+    видом совпадения и подсвеченным фрагментом, и курсор
+    следующей страницы."""
+    words = terms(query)
+    if not words:
+        return [], None
+    decoded = decode_cursor(cursor)
+    after = None
+    if decoded and decoded[0] == NEXT and len(decoded[1]) == 2:
+        try:
+            after = (float(decoded[1][0]), int(decoded[1][1]))
+        except ValueError:
+            after = None
+        if after and not (isfinite(after[0])
+                          and integer_in_range(after[1])):
+            after = None
+    rows = get_index().search(words, after, limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(NEXT, [rows[-1][4], rows[-1][0]])
+
+    from .models import Post
+
+    posts = Post.objects.feed().in_bulk({row[2] for row in rows})
+    results = [
+        {'post': posts[post_id], 'kind': kind, 'snippet': highlight(snippet)}
+        for _, kind, post_id, snippet, _ in rows if post_id in posts
+    ]
+    return results, next_cursor
@@ -0,0 +1,175 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import feed_cache, search, stats, timeline
+from .models import Comment, Follow, Group, Post, User
+
+
+# Счётчики обновляются раньше лент: раскладка смотрит
+# на число подписчиков автора
+@receiver(post_save, sender=Post)
+def post_stats_created(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, 'posts', 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_stats_deleted(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'posts', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_stats_created(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, 'followers', 1)
+        stats.bump(instance.user_id, 'following', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_stats_deleted(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'followers', -1)
+    stats.bump(instance.user_id, 'following', -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_stats_created(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, 'comments', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_stats_deleted(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'comments', -1)
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, **kwargs):
+    """Новый пост попадает в ленты подписчиков автора."""
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_prune(sender, instance, **kwargs):
+    timeline.unfollowed(instance.user_id, instance.author_id)
+
+
+# Инвалидация кеша лент: сменой поколения областей
+def previous_value(model, instance, field):
+    """Значение поля в базе до сохранения: после переименования
+    надо сбросить и ленту со старым адресом."""
+    if not instance.pk:
+        return None
+    return model.objects.filter(
+        pk=instance.pk
+    ).values_list(field, flat=True).first()
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_group(sender, instance, **kwargs):
+    """Запоминает прежнюю группу, чтобы сбросить и её ленту."""
+    instance._previous_group_id = previous_value(Post, instance, 'group_id')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_bump_feeds(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_group_id', None)
+    moved_from = []
+    if previous and previous != instance.group_id:
+        moved_from = Group.objects.filter(
+            pk=previous
+        ).values_list('slug', flat=True)
+    feed_cache.bump(*feed_cache.post_scopes(instance, *moved_from))
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_remember_feeds(sender, instance, **kwargs):
+    """Прежний адрес группы и авторы её постов: название и адрес
+    группы выводят главная и ленты этих авторов. При удалении
+    посты отвязываются от группы, поэтому авторы берутся до него."""
+    instance._previous_slug = previous_value(Group, instance, 'slug')
+    instance._usernames = []
+    if instance.pk:
+        instance._usernames = list(User.objects.filter(
+            posts__group=instance
+        ).values_list('username', flat=True).distinct())
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_bump_feed(sender, instance, **kwargs):
+    slugs = {instance.slug, getattr(instance, '_previous_slug', None)}
+    feed_cache.bump(
+        'index',
+        *[f'group:{slug}' for slug in slugs if slug],
+        *[f'author:{username}'
+          for username in getattr(instance, '_usernames', [])],
+    )
+
+
+def is_login(update_fields):
+    # Вход пользователя обновляет только last_login
+    return bool(update_fields) and set(update_fields) == {'last_login'}
+
+
+@receiver(pre_save, sender=User)
+def user_remember_username(sender, instance, update_fields=None,
+                           **kwargs):
+    if not is_login(update_fields):
+        instance._previous_username = previous_value(
+            User, instance, 'username'
+        )
+
+
+@receiver(post_save, sender=User)
+def user_bump_feeds(sender, instance, update_fields=None, **kwargs):
+    if is_login(update_fields):
+        return
+    # Имя автора выводят и ленты групп, где он писал
+    slugs = Group.objects.filter(
+        posts__author=instance
+    ).values_list('slug', flat=True).distinct()
+    usernames = {instance.username,
+                 getattr(instance, '_previous_username', None)}
+    feed_cache.bump(
+        'index',
+        *[f'author:{username}' for username in usernames if username],
+        *[f'group:{slug}' for slug in slugs],
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_bump_feed(sender, instance, **kwargs):
+    feed_cache.bump(f'author:{instance.author.username}',
+                    f'follow:{instance.user_id}')
+
+
+# Полнотекстовый индекс
+@receiver(post_save, sender=Post)
+def post_index(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindex(sender, instance, **kwargs):
+    search.unindex_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_index(sender, instance, **kwargs):
+    search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_unindex(sender, instance, **kwargs):
+    search.unindex_comment(instance)
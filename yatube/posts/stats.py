@@ -0,0 +1,47 @@
+from django.db.models import Count, F
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+STATS_BATCH_SIZE = 500
+
+# Счётчик и поле модели, по которому он считается
+COUNTERS = (
+    ('posts', Post, 'author_id'),
+    ('followers', Follow, 'author_id'),
+    ('following', Follow, 'user_id'),
+    ('comments', Comment, 'author_id'),
+)
+
+
+def bump(author_id, counter, delta):
+    """Атомарно сдвигает счётчик автора на delta."""
+    updated = AuthorStats.objects.filter(author_id=author_id).update(
+        **{counter: F(counter) + delta}
+    )
+    if not updated and delta > 0:
+        AuthorStats.objects.get_or_create(author_id=author_id)
+        AuthorStats.objects.filter(author_id=author_id).update(
+            **{counter: F(counter) + delta}
+        )
+
+
+def rebuild():
+    """Пересчитывает счётчики всех авторов с нуля."""
+    totals = {
+        counter: dict(
+            model.objects.order_by().values_list(field).annotate(
+                total=Count('id')
+            )
+        )
+        for counter, model, field in COUNTERS
+    }
+    AuthorStats.objects.all().delete()
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(author_id=author_id, **{
+            counter: totals[counter].get(author_id, 0)
+            for counter, _, _ in COUNTERS
+        }) for author_id in User.objects.values_list(
+            'id', flat=True
+        ).iterator()),
+        batch_size=STATS_BATCH_SIZE,
+    )
@@ -0,0 +1,50 @@
+import hashlib
+
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from core.cache import cache
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Карточка с заглушкой вместо миниатюры не кешируется
+PENDING_MARK = 'data-thumbnail-pending'
+
+
+def card_key(post, show_author, show_group):
+    """Ключ карточки: id поста, язык и версия - хеш всего,
+    что выводит карточка. Правка поста, имени автора или группы
+    даёт новый ключ, старая карточка просто вытесняется."""
+    version = hashlib.md5('|'.join(map(str, (
+        post.text, post.pub_date.isoformat(), post.image.name,
+        post.author.username, post.author.get_full_name(),
+        post.group.slug if show_group and post.group else '',
+        show_author, show_group,
+    ))).encode()).hexdigest()
+    return f'card:{post.id}:{get_language()}:{version}'
+
+
+@register.simple_tag
+def post_cards(posts, show_author=True, show_group=True):
+    """Готовые карточки постов страницы: одно cache.get_many
+    на страницу, отрисовываются только отсутствующие в кеше."""
+    posts = list(posts)
+    keys = [card_key(post, show_author, show_group) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            cards[key] = render_to_string(CARD_TEMPLATE, {
+                'post': post,
+                'show_author': show_author,
+                'show_group': show_group,
+            })
+            if PENDING_MARK not in cards[key]:
+                missing[key] = cards[key]
+    if missing:
+        cache.set_many(missing, CARD_CACHE_TIMEOUT)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,18 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_picture(post):
+    """Варианты картинки поста, если миниатюры уже созданы.
+    Иначе ставит их в очередь и возвращает None: шаблон
+    показывает заглушку, а не ждёт Pillow."""
+    if not post.image:
+        return None
+    picture = thumbnails.picture(post)
+    if picture is None:
+        thumbnails.queue(post)
+    return picture
@@ -0,0 +1,107 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from posts import search
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def create_dataset():
+    author = User.objects.create_user(username='writer')
+    reader = User.objects.create_user(username='reader')
+    group = Group.objects.create(
+        title='Тестовая группа', slug='test_slug', description='Описание'
+    )
+    posts = [
+        Post.objects.create(text=f'Пост {i}', author=author, group=group)
+        for i in range(5)
+    ]
+    Comment.objects.create(post=posts[0], author=reader, text='Комментарий')
+    Follow.objects.create(user=reader, author=author)
+    return reader, posts
+
+
+def clear_dataset():
+    User.objects.all().delete()
+    Group.objects.all().delete()
+
+
+def export():
+    output = StringIO()
+    call_command('export_yatube', batch_size=2,
+                 stdout=output, stderr=StringIO())
+    return output.getvalue()
+
+
+def import_dump(dump, **options):
+    output = StringIO()
+    with tempfile.NamedTemporaryFile(
+            'w', suffix='.ndjson', delete=False, encoding='utf-8') as file:
+        file.write(dump)
+    try:
+        call_command('import_yatube', file.name, stdout=output, **options)
+    finally:
+        os.remove(file.name)
+    return output.getvalue()
+
+
+class DatasetCommandsTests(TestCase):
+    """Выгрузка и загрузка данных в NDJSON"""
+
+    def test_round_trip(self):
+        """Загрузка восстанавливает строки, даты и производные данные"""
+        reader, posts = create_dataset()
+        dump = export()
+        self.assertEqual(len(dump.splitlines()), 2 + 1 + 5 + 1 + 1)
+        clear_dataset()
+        import_dump(dump, keep_indexes=True, batch_size=2)
+        self.assertEqual(
+            list(Post.objects.order_by('id').values_list(
+                'id', 'text', 'pub_date')),
+            [(post.id, post.text, post.pub_date) for post in posts],
+        )
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(reader.timeline.count(), 5)
+        self.assertEqual(
+            AuthorStats.objects.get(author__username='writer').posts, 5
+        )
+        words = search.terms('Комментарий')
+        self.assertEqual(len(search.get_index().search(words, None, 10)), 1)
+
+    def test_resume(self):
+        """Повторный запуск с --resume догружает только недостающее"""
+        create_dataset()
+        dump = export()
+        clear_dataset()
+        lines = dump.splitlines(keepends=True)
+        # Загрузка оборвалась после третьего поста
+        import_dump(''.join(lines[:6]), keep_indexes=True)
+        self.assertEqual(Post.objects.count(), 3)
+        output = import_dump(dump, keep_indexes=True, resume=True)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertIn('posts: 2 строк', output)
+
+
+class DeferredIndexesTests(TransactionTestCase):
+    """Индексы снимаются на время загрузки и создаются заново"""
+
+    def test_indexes_restored(self):
+        create_dataset()
+        dump = export()
+        clear_dataset()
+        import_dump(dump)
+        self.assertEqual(Post.objects.count(), 5)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        for index in Post._meta.indexes:
+            self.assertIn(index.name, constraints)
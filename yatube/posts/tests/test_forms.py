@@ -108,6 +108,16 @@ class PostCreateFormTests(TestCase):
             )
         )
 
+    def test_edit_post_updates_timestamp(self):
+        """Правка поста сдвигает время изменения"""
+        updated = Post.objects.get(id=self.post.id).updated
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Правленый текст', 'group': self.group.id}
+        )
+        self.assertGreater(Post.objects.get(id=self.post.id).updated,
+                           updated)
+
     def test_add_comment(self):
         """Тест добавления комментария.
         Комментировать может только авторизованный"""
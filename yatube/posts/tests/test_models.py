@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -57,3 +60,41 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def assertStats(self, user, **expected):
+        stats = AuthorStats.objects.get(author=user)
+        for counter, value in expected.items():
+            with self.subTest(user=user.username, counter=counter):
+                self.assertEqual(getattr(stats, counter), value)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.create(author=self.author, text='Пост 2')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        self.assertStats(self.author, posts=2, followers=1, following=0)
+        self.assertStats(self.reader, following=1, comments=1)
+        post.delete()
+        follow.delete()
+        self.assertStats(self.author, posts=1, followers=0)
+        self.assertStats(self.reader, following=0, comments=0)
+        self.assertFalse(Comment.objects.filter(pk=comment.pk).exists())
+
+    def test_rebuild_command(self):
+        """rebuild_author_stats восстанавливает счётчики с нуля."""
+        Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.update(posts=100, followers=100, following=7)
+        call_command('rebuild_author_stats', stdout=StringIO())
+        self.assertStats(self.author, posts=1, followers=1, following=0)
+        self.assertStats(self.reader, posts=0, following=1)
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanTests(TestCase):
+    """Запросы лент идут по индексам, без сортировки и полного скана"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def test_feed_query_plans(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            for query in queries.captured_queries:
+                if 'posts_' not in query['sql']:
+                    continue
+                for step in query_plan(query['sql']):
+                    with self.subTest(url=url, step=step):
+                        self.assertNotIn('TEMP B-TREE', step)
+                        if step.startswith('SCAN'):
+                            self.assertIn('INDEX', step)
@@ -3,18 +3,34 @@ import tempfile
 
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.shortcuts import get_object_or_404
 
-from posts.models import Post, Group, Comment, Follow
+from posts import search, thumbnails
+from posts.feed_cache import page_key
+from posts.models import Post, Group, Comment, Follow, TimelineEntry
+from posts.paginator import NEXT, encode_cursor, estimated_count
+from posts.templatetags.post_cards import card_key, post_cards
+from posts.views import COMMENTS_ON_PAGE
 
 User = get_user_model()
 NUMBER_OF_POSTS: int = 13
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+THUMBNAIL_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -158,25 +174,62 @@ class PostsViewTests(TestCase):
         'posts:index', 'posts:group_list' и 'posts:profile'"""
 
         templates_url_names = [
-            (reverse('posts:index'), 10),
-            (reverse('posts:index') + '?page=2', 3),
-            (reverse(
-                'posts:group_list', kwargs={'slug': self.group.slug}
-            ), 10),
-            (reverse(
+            reverse('posts:index'),
+            reverse(
                 'posts:group_list', kwargs={'slug': self.group.slug}
-            ) + '?page=2', 3),
-            (reverse('posts:profile', args={self.user}), 10),
-            (reverse('posts:profile', args={self.user}) + '?page=2', 3),
+            ),
+            reverse('posts:profile', args={self.user}),
         ]
 
-        for reverse_name, expected_num_posts in templates_url_names:
+        for reverse_name in templates_url_names:
             with self.subTest(reverse_name=reverse_name):
                 response = self.authorized_client.get(reverse_name)
+                first_page = response.context['page_obj']
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(first_page), 10)
+                self.assertIsNone(first_page.previous_cursor)
+                response = self.authorized_client.get(
+                    reverse_name, {'cursor': first_page.next_cursor}
+                )
+                second_page = response.context['page_obj']
+                self.assertEqual(len(second_page), 3)
+                self.assertIsNone(second_page.next_cursor)
+                self.assertEqual(
+                    list(first_page) + list(second_page),
+                    list(self.posts)
+                )
+                response = self.authorized_client.get(
+                    reverse_name, {'cursor': second_page.previous_cursor}
+                )
+                self.assertEqual(
+                    list(response.context['page_obj']), list(first_page)
+                )
+
+    def test_paginator_bad_cursor(self):
+        """Некорректный курсор открывает первую страницу"""
+
+        for cursor in ('garbage', 'bnxub3QtYS1kYXRlfDE'):
+            with self.subTest(cursor=cursor):
+                response = self.authorized_client.get(
+                    reverse('posts:index'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_paginator_out_of_range_cursor(self):
+        """Курсор с числом вне диапазона базы открывает первую
+        страницу, а не ошибку 500"""
+        cursor = encode_cursor(NEXT, ['2026-01-01T00:00:00',
+                                      '99999999999999999999'])
+        urls = (
+            reverse('posts:index'),
+            reverse('api:posts'),
+            reverse('posts:post_comments', args=[self.posts[0].id]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url, {'cursor': cursor})
                 self.assertEqual(response.status_code, 200)
-                self.assertEqual(len(
-                    response.context['page_obj']
-                ), expected_num_posts)
 
     def test_post_added_correctly(self):
         """Пост при создании добавлен корректно"""
@@ -216,14 +269,508 @@ class PostsViewTests(TestCase):
         self.assertIn(comment, post_detail, ' у поста нет комментария')
 
     def test_index_caches(self):
-        """Страница index кешируется"""
+        """Страница index кешируется до изменения постов"""
         response = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.all().delete()
+        # update() не шлёт сигналов: кеш об изменении не знает
+        Post.objects.filter(pk=self.posts[0].pk).update(text='Изменён')
         response1 = self.authorized_client.get(reverse('posts:index'))
-        cache.clear()
-        response2 = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(response.content, response1.content)
+        Post.objects.all().delete()
+        response2 = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(response1.content, response2.content)
+        self.assertEqual(len(response2.context['page_obj']), 0)
+
+    def test_feed_caches_invalidated(self):
+        """Новый пост сразу виден в ленте группы и профиле"""
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        post = Post.objects.create(
+            text='Свежий пост', author=self.user, group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_author_rename_resets_group_feed(self):
+        """Новое имя автора сразу видно в ленте группы"""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.authorized_client.get(url)
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        self.assertContains(self.authorized_client.get(url),
+                            'Переименованный')
+        self.user.first_name = ''
+        self.user.save()
+
+    def test_renames_reset_old_addresses(self):
+        """После смены адреса группы и имени автора старые адреса
+        не отдаются из кеша, а главная ссылается на новые"""
+        old_group = reverse('posts:group_list', args=[self.group.slug])
+        old_profile = reverse('posts:profile', args=[self.user.username])
+        for url in (old_group, old_profile, reverse('posts:index')):
+            self.assertEqual(self.authorized_client.get(url).status_code, 200)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new_slug'
+        group.save()
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'new_name'
+        user.save()
+        for url in (old_group, old_profile):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.authorized_client.get(url).status_code, 404
+                )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(
+            response, reverse('posts:group_list', args=['new_slug'])
+        )
+        self.assertContains(
+            response, reverse('posts:profile', args=['new_name'])
+        )
+
+    def test_feed_cache_stale_while_rebuilding(self):
+        """Пока страницу перестраивает другой запрос, отдаётся старая копия"""
+        response = self.authorized_client.get(reverse('posts:index'))
+        lock = page_key(response.wsgi_request) + ':lock'
+        Post.objects.create(text='Свежий пост', author=self.user)
+        cache.add(lock, 1)
+        stale = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(stale.content, response.content)
+        cache.delete(lock)
+        fresh = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(fresh, 'Свежий пост')
+
+
+class PostCardsTests(TestCase):
+    """Карточки постов кешируются и обновляются вместе с данными"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_card_cached(self):
+        """Повторная отрисовка берёт карточку из кеша"""
+        post = Post.objects.feed().get(pk=self.post.pk)
+        first = post_cards([post])
+        cache.set(card_key(post, True, True), 'из кеша')
+        self.assertIn('Тестовый пост', first[0])
+        self.assertEqual(post_cards([post]), ['из кеша'])
+
+    def test_card_key_follows_author_and_group(self):
+        """Смена имени автора или группы даёт новый ключ карточки"""
+        post = Post.objects.feed().get(pk=self.post.pk)
+        key = card_key(post, True, True)
+        self.user.first_name = 'Лев'
+        self.user.save()
+        post = Post.objects.feed().get(pk=self.post.pk)
+        renamed_key = card_key(post, True, True)
+        self.assertNotEqual(key, renamed_key)
+        post.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.assertNotEqual(renamed_key, card_key(post, True, True))
+
+
+@override_settings(MEDIA_ROOT=THUMBNAIL_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    """Миниатюры создаются в фоне, до этого выводится заглушка"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(THUMBNAIL_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_placeholder_until_generated(self):
+        url = reverse('posts:post_detail', args=[self.post.id])
+        response = self.client.get(url)
+        self.assertContains(response, 'thumbnail_pending.svg')
+        self.assertIsNotNone(
+            cache.get(thumbnails.queued_key(self.post.image.name))
+        )
+        thumbnails.generate(self.post.id, self.post.image.name)
+        thumbnail = thumbnails.cached_thumbnail(self.post.image)
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(url)
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, 'thumbnail_pending.svg')
+        self.assertContains(response, '<source type="image/webp"')
+        webp = thumbnails.cached_thumbnail(
+            self.post.image, thumbnails.geometry(480), format='WEBP'
+        )
+        self.assertContains(response, f'{webp.url} 480w')
+        self.assertTrue(webp.url.endswith('.webp'))
+
+    def test_pool_worker_does_not_touch_cache(self):
+        """Дочерний процесс только рисует миниатюры, кеш лент
+        сбрасывает процесс, поставивший задачу"""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        self.client.get(url)
+        name = self.post.image.name
+        self.assertTrue(thumbnails.render(name))
+        self.assertIsNotNone(cache.get(thumbnails.queued_key(name)))
+        thumbnails.finish(self.post.id, name)
+        self.assertIsNone(cache.get(thumbnails.queued_key(name)))
+        self.assertNotContains(self.client.get(url), 'thumbnail_pending.svg')
+
+    def test_pending_card_not_cached(self):
+        post = Post.objects.feed().get(pk=self.post.pk)
+        post_cards([post])
+        self.assertIsNone(cache.get(card_key(post, True, True)))
+        thumbnails.generate(post.id, post.image.name)
+        post_cards([post])
+        self.assertIsNotNone(cache.get(card_key(post, True, True)))
+
+
+class QueryCountTests(TestCase):
+    """Число запросов на страницу не зависит от числа постов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(NUMBER_OF_POSTS):
+            Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=cls.author,
+                group=cls.group,
+            )
+        cls.post = Post.objects.first()
+        for i in range(5):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def test_feed_query_count(self):
+        """Ленты и страница поста выполняют фиксированное число запросов"""
+        # Два запроса уходят на сессию и пользователя
+        # ещё один-два - на ETag страницы, один - на ключи соседних
+        # страниц навигации, один - на статистику таблицы (она
+        # кешируется, а кеш перед тестом очищен)
+        pages = (
+            (reverse('posts:index'), 6),
+            (reverse('posts:group_list', args=[self.group.slug]), 7),
+            (reverse('posts:profile', args=[self.author.username]), 7),
+            (reverse('posts:follow_index'), 6),
+            (reverse('posts:post_detail', args=[self.post.id]), 6),
+        )
+        for url, queries in pages:
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.client.get(url)
+
+
+class NavigationTests(TestCase):
+    """Навигация ленты: первая, соседние и последняя страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author) for i in range(65)
+        )
+        cls.posts = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        cache.clear()
+
+    def navigation(self, params=None):
+        response = self.client.get(reverse('posts:index'), params)
+        page_obj = response.context['page_obj']
+        return page_obj, [(link['kind'], link['number'])
+                          for link in page_obj.navigation]
+
+    def test_bad_page_number(self):
+        """Номер страницы, который не разбирается как число,
+        просто не выводится"""
+        for page in ('²', 'abc', '-3', '0'):
+            with self.subTest(page=page):
+                response = self.client.get(reverse('posts:index'),
+                                           {'page': page})
+                self.assertEqual(response.status_code, 200)
+
+    def test_window(self):
+        """Соседние страницы нумеруются от текущей"""
+        page_obj, links = self.navigation()
+        self.assertEqual(links, [
+            ('current', 1), ('next', 2), ('next', 3), ('last', None),
+        ])
+        cursor = page_obj.navigation[2]['cursor']
+        page_obj, links = self.navigation({'cursor': cursor, 'page': 3})
+        self.assertEqual(list(page_obj), self.posts[20:30])
+        self.assertEqual(links, [
+            ('first', None), ('previous', 2), ('current', 3),
+            ('next', 4), ('next', 5), ('last', None),
+        ])
+        cursor = page_obj.navigation[1]['cursor']
+        page_obj, _ = self.navigation({'cursor': cursor, 'page': 2})
+        self.assertEqual(list(page_obj), self.posts[10:20])
+
+    def test_last_page(self):
+        """Последняя страница открывается без подсчёта строк"""
+        page_obj, _ = self.navigation()
+        page_obj, links = self.navigation(
+            {'cursor': page_obj.navigation[-1]['cursor']}
+        )
+        self.assertEqual(list(page_obj), self.posts[-10:])
+        self.assertEqual(links, [
+            ('first', None), ('previous', None), ('current', None),
+        ])
+
+    def test_group_last_page(self):
+        """Номер последней страницы группы - по числу её постов,
+        а не по среднему на группу из статистики"""
+        groups = [Group.objects.create(title=f'Группа {i}', slug=f'g{i}',
+                                       description='') for i in range(2)]
+        Post.objects.bulk_create(
+            [Post(text='Пост', author=self.author, group=groups[0])
+             for _ in range(45)]
+            + [Post(text='Пост', author=self.author, group=groups[1])]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        response = self.client.get(
+            reverse('posts:group_list', args=['g0'])
+        )
+        navigation = response.context['page_obj'].navigation
+        self.assertEqual(navigation[-1]['estimate'], 5)
+
+    def test_estimated_last_page(self):
+        """Номер последней страницы оценивается по статистике ANALYZE"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimated_count(Post), 65)
+        page_obj, _ = self.navigation()
+        self.assertEqual(page_obj.navigation[-1]['estimate'], 7)
+
+
+class SearchTests(TestCase):
+    """Поиск по постам и комментариям через полнотекстовый индекс"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(
+            text='Пишу про <b>Кефир</b> и погоду', author=cls.user
+        )
+        cls.other = Post.objects.create(text='Совсем другое', author=cls.user)
+        Comment.objects.create(
+            post=cls.other, author=cls.user, text='А кефир лучше молока'
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return response.context['results'], response
+
+    def test_search_posts_and_comments(self):
+        """Находит пост и комментарий, подсвечивает совпадение"""
+        results, response = self.search('КЕФИР')
+        self.assertEqual(
+            {(result['post'], result['kind']) for result in results},
+            {(self.post, 'post'), (self.other, 'comment')},
+        )
+        self.assertContains(response, '<mark>Кефир</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+        self.assertNotContains(response, '<b>Кефир')
+
+    def test_index_follows_changes(self):
+        """Правка и удаление поста сразу видны в поиске"""
+        self.post.text = 'Теперь про чай'
+        self.post.save()
+        results, _ = self.search('чай')
+        self.assertEqual([result['post'] for result in results], [self.post])
+        self.assertEqual(len(self.search('кефир')[0]), 1)
+        Post.objects.get(pk=self.other.pk).delete()
+        self.assertEqual(self.search('кефир')[0], [])
+
+    def test_search_cursor(self):
+        """Результаты листаются курсором без повторов"""
+        for i in range(NUMBER_OF_POSTS):
+            Post.objects.create(text=f'Молоко номер {i}', author=self.user)
+        seen = []
+        results, response = self.search('молоко')
+        seen += [result['post'].pk for result in results]
+        while response.context['next_cursor']:
+            results, response = self.search(
+                'молоко', cursor=response.context['next_cursor']
+            )
+            seen += [result['post'].pk for result in results]
+        self.assertEqual(len(seen), NUMBER_OF_POSTS)
+        self.assertEqual(len(set(seen)), NUMBER_OF_POSTS)
+
+    def test_search_bad_cursor(self):
+        """Курсор с числом вне диапазона базы открывает первую страницу"""
+        first, _ = self.search('кефир')
+        self.assertTrue(first)
+        for values in (['1.0', '99999999999999999999'], ['nan', '1']):
+            with self.subTest(values=values):
+                results, response = self.search(
+                    'кефир', cursor=encode_cursor(NEXT, values)
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(results, first)
+
+    def test_memory_index_matches_fts5(self):
+        """Запасной индекс в памяти находит то же, что FTS5"""
+        index = search.InvertedIndex()
+        words = search.terms('кефир')
+        self.assertEqual(
+            {row[0] for row in index.search(words, None, 10)},
+            {row[0] for row in search.fts5_index.search(words, None, 10)},
+        )
+        snippet = index.search(['погоду'], None, 1)[0][3]
+        self.assertIn(f'{search.MARK_OPEN}погоду{search.MARK_CLOSE}', snippet)
+
+
+class CommentsPageTests(TestCase):
+    """Комментарии поста выводятся порциями по курсору"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(COMMENTS_ON_PAGE + 5)
+        )
+
+    def test_first_page_is_limited(self):
+        """Страница поста выводит только первую порцию"""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_ON_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(response, comments.next_cursor)
+
+    def test_next_chunk(self):
+        """Фрагмент и JSON отдают оставшиеся комментарии"""
+        url = reverse('posts:post_comments', args=[self.post.id])
+        cursor = self.client.get(url).context['comments'].next_cursor
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertContains(response, 'Комментарий 24')
+        self.assertNotContains(response, 'Комментарий 19')
+        self.assertNotContains(response, 'data-comments-more')
+        data = self.client.get(
+            url, {'cursor': cursor, 'format': 'json'}
+        ).json()
+        self.assertEqual(len(data['comments']), 5)
+        self.assertEqual(data['comments'][0]['author'], 'writer')
+        self.assertIsNone(data['next_cursor'])
+
+    def test_missing_post(self):
+        """У несуществующего поста нет комментариев: 404"""
+        url = reverse('posts:post_comments', args=[self.post.id + 1])
+        for params in ({}, {'format': 'json'}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    """Неизменившиеся страницы отдаются ответом 304"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return etag, self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified(self):
+        """Повторный запрос с ETag получает 304 без рендеринга"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                _, response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_feed_etags_do_not_count(self):
+        """ETag главной и ленты подписок не считает строки
+        и не соединяет подписки с постами"""
+        Follow.objects.create(user=self.user, author=self.author)
+        for url in (reverse('posts:index'), reverse('posts:follow_index')):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+                    self.assertNotIn('posts_follow', query['sql'])
+
+    def test_changes_reset_etag(self):
+        """Правка поста, комментарий и подписка меняют ETag"""
+        changes = (
+            (reverse('posts:index'),
+             lambda: Post.objects.create(text='Новый', author=self.author)),
+            (reverse('posts:post_detail', args=[self.post.id]),
+             lambda: Comment.objects.create(
+                 post=self.post, author=self.user, text='Комментарий')),
+            (reverse('posts:profile', args=[self.author.username]),
+             lambda: Post.objects.get(pk=self.post.pk).delete()),
+            (reverse('posts:follow_index'),
+             lambda: Follow.objects.create(
+                 user=self.user, author=self.author)),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                change()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
 
 
 class FollowViewsTest(TestCase):
@@ -365,3 +912,127 @@ class FollowViewsTest(TestCase):
         self.assertFalse(Follow.objects.filter(
             user=self.user, author=self.following_author
         ).exists())
+
+    def test_timeline_fan_out(self):
+        '''Подписка дозаполняет ленту, новый пост раскладывается
+        подписчикам, отписка очищает ленту.'''
+        Follow.objects.create(user=self.follower, author=self.user)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 2
+        )
+        post = Post.objects.create(author=self.user, text='Новый пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post, pub_date=post.pub_date
+        ).exists())
+        response = self.client_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+        Follow.objects.filter(user=self.follower, author=self.user).delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_timeline_pull_author(self):
+        '''Посты популярного автора читаются напрямую, без раскладки.'''
+        Follow.objects.create(user=self.follower, author=self.user)
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists()
+        )
+        response = self.client_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(Post.objects.filter(author=self.user).order_by(
+                '-pub_date', '-id'
+            ))
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_timeline_author_no_longer_pulled(self):
+        '''Автор, переставший быть популярным после отписки,
+        раскладывается по лентам оставшихся подписчиков.'''
+        Follow.objects.create(user=self.follower, author=self.user)
+        Follow.objects.create(user=self.following_author, author=self.user)
+        post = Post.objects.create(author=self.user, text='Новый пост')
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.follower, post=post
+        ).exists())
+        Follow.objects.filter(
+            user=self.following_author, author=self.user
+        ).delete()
+        response = self.client_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post
+        ).exists())
+
+
+class FeedTests(TestCase):
+    """RSS и Atom лент отдаются из кеша и сбрасываются правкой поста"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds(self):
+        """Каждая лента содержит пост и ссылку на него"""
+        urls = (
+            reverse('posts:index_rss'),
+            reverse('posts:index_atom'),
+            reverse('posts:group_rss', args=[self.group.slug]),
+            reverse('posts:group_atom', args=[self.group.slug]),
+            reverse('posts:author_rss', args=[self.author.username]),
+            reverse('posts:author_atom', args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Тестовый пост')
+                self.assertContains(response, reverse(
+                    'posts:post_detail', args=[self.post.id]
+                ))
+
+    def test_missing_group(self):
+        """Лента несуществующей группы - 404"""
+        response = self.client.get(reverse('posts:group_rss', args=['no']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_polling_is_cheap(self):
+        """Повторный опрос берёт ленту из кеша, а с ETag получает 304:
+        в базу уходит только запрос версии ленты"""
+        url = reverse('posts:group_rss', args=[self.group.slug])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(2):
+            self.assertContains(self.client.get(url), 'Тестовый пост')
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_bypassing_signals_resets_etag(self):
+        """Пост, записанный мимо сигналов (bulk_create, импорт или
+        другой процесс с отдельным кешем), меняет ETag ленты"""
+        url = reverse('posts:index_rss')
+        etag = self.client.get(url)['ETag']
+        Post.objects.bulk_create([Post(text='Импорт', author=self.author)])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_change_invalidates(self):
+        """Правка и удаление поста обновляют ленты"""
+        url = reverse('posts:author_atom', args=[self.author.username])
+        etag = self.client.get(url)['ETag']
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новый текст')
+        post.delete()
+        self.assertNotContains(self.client.get(url), 'Новый текст')
@@ -0,0 +1,193 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# sorl-thumbnail 12.7 масштабирует с Image.ANTIALIAS,
+# который убран в Pillow 10
+if not hasattr(Image, 'ANTIALIAS'):
+    Image.ANTIALIAS = Image.LANCZOS
+
+# Основная миниатюра карточки поста: по ней шаблон решает,
+# готова ли картинка, и отдаёт её браузерам без <picture>
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+# Ширины вариантов для srcset, высота сохраняет пропорцию 960x339
+THUMBNAIL_WIDTHS = (480, 960)
+# Современные форматы в порядке предпочтения браузером
+MODERN_FORMATS = (
+    ('AVIF', 'image/avif'),
+    ('WEBP', 'image/webp'),
+)
+
+# sorl знает расширения только JPEG, PNG, GIF и WEBP
+EXTENSIONS.setdefault('AVIF', 'avif')
+# Повторно ставить миниатюру в очередь не раньше, чем через
+QUEUED_TIMEOUT = 5 * 60
+
+_executor = None
+
+
+def queued_key(name):
+    return f'thumbnail:queued:{name}'
+
+
+def modern_formats():
+    """Современные форматы, которые умеет сохранять установленный Pillow."""
+    Image.init()
+    return [(format_, mime) for format_, mime in MODERN_FORMATS
+            if format_ in Image.SAVE]
+
+
+def geometry(width):
+    return f'{width}x{round(width * 339 / 960)}'
+
+
+def variants():
+    """Формат, MIME-тип и ширина каждого варианта для srcset."""
+    for format_, mime in modern_formats():
+        for width in THUMBNAIL_WIDTHS:
+            yield format_, mime, width
+    for width in THUMBNAIL_WIDTHS:
+        yield 'JPEG', 'image/jpeg', width
+
+
+def cached_thumbnail(image, geometry_string=THUMBNAIL_GEOMETRY, **extra):
+    """Готовая миниатюра из хранилища sorl или None.
+    В отличие от get_thumbnail, ничего не генерирует."""
+    backend = ThumbnailBackend()
+    source = ImageFile(image)
+    options = dict(THUMBNAIL_OPTIONS, **extra)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry_string, options)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def picture(post):
+    """Готовые варианты картинки поста для <picture>.
+    None, пока нет основной миниатюры. Недостающие варианты
+    (например, у постов до их появления) ставятся в очередь."""
+    fallback = cached_thumbnail(post.image)
+    if fallback is None:
+        return None
+    srcsets = {}
+    complete = True
+    for format_, mime, width in variants():
+        thumbnail = cached_thumbnail(
+            post.image, geometry(width), format=format_
+        )
+        if thumbnail is None:
+            complete = False
+            continue
+        srcsets.setdefault(mime, []).append(f'{thumbnail.url} {width}w')
+    if not complete:
+        queue(post)
+    return {
+        'complete': complete,
+        'fallback': fallback,
+        'fallback_srcset': ', '.join(srcsets.pop('image/jpeg', [])),
+        'sources': [{'type': mime, 'srcset': ', '.join(srcset)}
+                    for mime, srcset in srcsets.items()],
+    }
+
+
+def enqueue(post):
+    """Ставит в очередь миниатюру новой или изменённой картинки."""
+    if post.image and not cached_thumbnail(post.image):
+        queue(post)
+
+
+def queue(post):
+    """Ставит генерацию миниатюры в пул после коммита.
+    Повторные вызовы для той же картинки ничего не делают,
+    пока задача не выполнена."""
+    name = post.image.name
+    if cache.add(queued_key(name), post.pk, QUEUED_TIMEOUT):
+        transaction.on_commit(lambda: submit(post.pk, name))
+
+
+def submit(post_id, name):
+    workers = getattr(settings, 'THUMBNAIL_WORKERS', 0)
+    if not workers:
+        generate(post_id, name)
+        return
+    global _executor
+    if _executor is None:
+        # spawn: дочерние процессы не наследуют соединения с базой
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_setup_worker,
+        )
+    future = _executor.submit(render, name)
+    future.add_done_callback(lambda future: _finished(post_id, name))
+
+
+def _setup_worker():
+    import django
+    django.setup()
+
+
+def render(name):
+    """Создаёт все варианты миниатюры, в пуле - в дочернем процессе.
+    Кеш locmem там свой, поэтому кеш лент сбрасывает finish()
+    в процессе, который поставил задачу."""
+    try:
+        for format_, _, width in variants():
+            get_thumbnail(name, geometry(width),
+                          format=format_, **THUMBNAIL_OPTIONS)
+        # Основная миниатюра последней: она означает, что готово всё
+        get_thumbnail(name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        return False
+    return True
+
+
+def finish(post_id, name):
+    """Снимает отметку очереди и сбрасывает кеш лент,
+    где висела заглушка."""
+    from . import feed_cache
+    from .models import Post
+
+    cache.delete(queued_key(name))
+    post = Post.objects.select_related(
+        'author', 'group'
+    ).filter(pk=post_id).first()
+    if post is not None:
+        feed_cache.bump(*feed_cache.post_scopes(post))
+
+
+def _finished(post_id, name):
+    # Колбэк future выполняется в служебном потоке пула
+    try:
+        finish(post_id, name)
+    except Exception:
+        logger.exception('Не удалось сбросить кеш лент поста %s', post_id)
+    finally:
+        connections.close_all()
+
+
+def generate(post_id, name):
+    """Миниатюра прямо в текущем процессе."""
+    render(name)
+    finish(post_id, name)
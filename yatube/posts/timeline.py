@@ -0,0 +1,138 @@
+from django.conf import settings
+
+from .models import AuthorStats, FEED_FIELDS, Follow, Post, TimelineEntry
+from .paginator import CursorPaginator
+
+# Авторы, у которых подписчиков больше этого числа, не раскладывают
+# посты по лентам при публикации: их посты подмешиваются при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+# Размер пачки для bulk_create при раскладке и дозаполнении ленты
+TIMELINE_BATCH_SIZE = 500
+
+
+def fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', TIMELINE_FANOUT_LIMIT)
+
+
+def followers(author):
+    return AuthorStats.objects.filter(
+        author=author
+    ).values_list('followers', flat=True).first() or 0
+
+
+def is_pull_author(author):
+    """Автор слишком популярен для fan-out on write."""
+    return followers(author) > fanout_limit()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_pull_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту пользователя уже опубликованные посты автора."""
+    if is_pull_author(author_id):
+        return
+    posts = Post.objects.filter(
+        author=author_id
+    ).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()),
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты пользователя посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user=user_id,
+        post__in=Post.objects.filter(author=author_id).values('id'),
+    ).delete()
+
+
+def unfollowed(user_id, author_id):
+    """Отписка: убирает посты автора из ленты пользователя. Если
+    автор при этом перестал быть популярным, его посты больше
+    не подмешиваются при чтении - раскладывает их по лентам всех
+    оставшихся подписчиков. Счётчик подписчиков уже уменьшен."""
+    prune(user_id, author_id)
+    if followers(author_id) == fanout_limit():
+        for follower_id in Follow.objects.filter(
+                author=author_id).values_list('user_id', flat=True):
+            backfill(follower_id, author_id)
+
+
+def rebuild():
+    """Раскладывает ленты всех подписок заново, например после
+    загрузки данных в обход сигналов. Счётчики подписчиков
+    к этому моменту должны быть актуальны."""
+    TimelineEntry.objects.all().delete()
+    for user_id, author_id in Follow.objects.values_list(
+            'user_id', 'author_id').iterator():
+        backfill(user_id, author_id)
+
+
+def pull_authors(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers__gt=fanout_limit(),
+        ).values_list('author_id', flat=True)
+    )
+
+
+class FollowFeedPaginator(CursorPaginator):
+    """Лента подписок: диапазон по TimelineEntry пользователя,
+    слитый с постами популярных авторов (fan-out on read)."""
+
+    def __init__(self, user, per_page):
+        super().__init__(self.entries(user), per_page,
+                         ordering=('-pub_date', '-post_id'))
+        authors = pull_authors(user)
+        self.pulled = None
+        if authors:
+            self.pulled = CursorPaginator(
+                self.posts().filter(author__in=authors), per_page,
+            )
+
+    def entries(self, user):
+        return TimelineEntry.objects.filter(
+            user=user
+        ).select_related('post__author', 'post__group').only(
+            'pub_date', 'post_id',
+            *[f'post__{field}' for field in FEED_FIELDS]
+        )
+
+    def posts(self):
+        return Post.objects.feed()
+
+    def _fetch(self, values, forward, limit):
+        posts = self._posts(super()._fetch(values, forward, limit))
+        if self.pulled is None:
+            return posts
+        # Посты могут попасть в обе выборки, если автор стал
+        # популярным уже после раскладки
+        merged = {self._key(post)[-1]: post for post in
+                  posts + self.pulled._fetch(values, forward, limit)}
+        return sorted(merged.values(), key=self._key,
+                      reverse=forward)[:limit]
+
+    def _posts(self, entries):
+        return [entry.post for entry in entries]
+
+    def _key(self, item):
+        return [item.pub_date, item.id]
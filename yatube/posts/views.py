@@ -1,26 +1,63 @@
-from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Group, User, Follow
+from .models import Post, Group, User, Follow, Comment
 from .forms import PostForm, CommentForm
+from .paginator import CursorPaginator, estimated_count
+from .timeline import FollowFeedPaginator
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from .feed_cache import feed_cache
+from . import conditional
+from . import thumbnails
+from .search import search_posts
 
 POSTS_ON_MAIN = 10
+COMMENTS_ON_PAGE = 20
+# Сколько соседних страниц показывать в навигации с каждой стороны
+NAVIGATION_WINDOW = 2
 
 
-# Паджинатор
-def get_page_context(request, post_list):
-    paginator = Paginator(post_list, POSTS_ON_MAIN)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+def page_number(request):
+    """Номер страницы из ссылки навигации, только для подписи."""
+    try:
+        number = int(request.GET.get('page', ''))
+    except ValueError:
+        return None
+    return number if number > 0 else None
+
+
+# Паджинатор по курсору (pub_date, id): глубокие страницы стоят
+# столько же, сколько первая. count - оценка числа постов
+# для номера последней страницы, точный COUNT(*) не нужен
+def get_page_context(request, post_list, count=None):
+    paginator = CursorPaginator(post_list, POSTS_ON_MAIN)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    page_obj.navigation = paginator.navigation(
+        page_obj, NAVIGATION_WINDOW, page_number(request), count
+    )
+    return page_obj
+
+
+# Комментарии листаются по (created, id) от старых к новым,
+# порцию отдаёт индекс comment_post_created_idx
+def get_comments_page(post_id, cursor):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only(
+        'id', 'text', 'created', 'post_id', 'author__id', 'author__username'
+    )
+    paginator = CursorPaginator(
+        comments, COMMENTS_ON_PAGE, ordering=('created', 'id')
+    )
+    return paginator.get_page(cursor)
 
 
 # Главная страница
-@cache_page(20, key_prefix='index_page')
+@conditional.index_condition
+@feed_cache('index')
 def index(request):
     title = 'Последние обновления на сайте'
-    post_list = Post.objects.all()
-    page_obj = get_page_context(request, post_list)
+    post_list = Post.objects.feed()
+    page_obj = get_page_context(request, post_list, estimated_count(Post))
     context = {
         'posts': post_list,
         'title': title,
@@ -30,11 +67,16 @@ def index(request):
 
 
 # Страница с постами (по группам)
+@conditional.group_condition
+@feed_cache('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = Post.objects.feed().filter(group=group)
     title = 'Записи сообщества'
-    page_obj = get_page_context(request, posts)
+    # Статистика ANALYZE знает только среднее число постов
+    # на группу, поэтому считаем точно: страница живёт в кеше
+    # до правки в группе
+    page_obj = get_page_context(request, posts, posts.count())
     context = {
         'title': title,
         'group': group,
@@ -45,10 +87,15 @@ def group_posts(request, slug):
 
 
 # Страница пользователя
+@conditional.profile_condition
+@feed_cache('author:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    page_obj = get_page_context(request, posts)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = Post.objects.feed().filter(author=author)
+    stats = getattr(author, 'stats', None)
+    page_obj = get_page_context(request, posts, stats and stats.posts)
     if request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
         author=author
@@ -66,9 +113,12 @@ def profile(request, username):
 
 
 # Страница поста
+@conditional.post_condition
 def post_detail(request, post_id):
-    one_post = get_object_or_404(Post, id=post_id)
-    comments = one_post.comments.all()
+    one_post = get_object_or_404(
+        Post.objects.with_author_stats(), id=post_id
+    )
+    comments = get_comments_page(post_id, request.GET.get('comments'))
     form = CommentForm()
     user = request.user.username
     author = one_post.author.username
@@ -85,6 +135,28 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+# Следующая порция комментариев: HTML-фрагмент или JSON
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = get_comments_page(post_id, request.GET.get('cursor'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [{
+                'id': comment.id,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created,
+            } for comment in comments],
+            'next_cursor': comments.next_cursor,
+        })
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 # Страница создания нового поста
 @login_required
 def post_create(request):
@@ -95,6 +167,7 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            thumbnails.enqueue(post)
             return redirect('posts:profile', request.user.username)
     else:
         form = PostForm()
@@ -103,6 +176,7 @@ def post_create(request):
 
 def post_edit(request, post_id):
     is_edit = True
+    # Пост целиком: save() отложенной модели не записал бы updated
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
         return redirect('posts:post_detail', post_id=post.pk)
@@ -115,6 +189,7 @@ def post_edit(request, post_id):
                 post = form.save(commit=False)
                 post.author = request.user
                 post.save()
+                thumbnails.enqueue(post)
                 return redirect('posts:post_detail', post_id=post.pk)
         else:
             form = PostForm(instance=post)
@@ -124,7 +199,7 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -135,9 +210,16 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional.follow_condition
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_context(request, posts)
+    # Лента читается из материализованного TimelineEntry
+    paginator = FollowFeedPaginator(request.user, POSTS_ON_MAIN)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    # Ключи дальних страниц знает только TimelineEntry, без постов
+    # авторов с fan-out on read, поэтому в навигации только соседние
+    page_obj.navigation = paginator.navigation(
+        page_obj, 1, page_number(request)
+    )
     context = {
         'page_obj': page_obj
     }
@@ -168,3 +250,17 @@ def profile_unfollow(request, username):
         'posts:profile',
         username
     )
+
+
+# Полнотекстовый поиск по постам и комментариям
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results, next_cursor = search_posts(
+        query, request.GET.get('cursor'), POSTS_ON_MAIN
+    )
+    context = {
+        'query': query,
+        'results': results,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/search.html', context)
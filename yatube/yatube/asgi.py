@@ -0,0 +1,18 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no ASGI support of its own, see core/asgi.py:
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from core.asgi import get_asgi_application
+from core.templates import warm_on_startup
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = get_asgi_application()
+warm_on_startup()
@@ -12,6 +12,10 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from core.cache import cache_settings
+from core.routers import replica_databases
+from core.templates import template_settings
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -40,6 +44,7 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 INSTALLED_APPS = [
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
@@ -54,6 +59,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.ReplicaMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +72,15 @@ MIDDLEWARE = [
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Ответы короче порога (байт) не сжимаются, см. core/compression.py
+COMPRESS_MIN_SIZE = int(os.environ.get('YATUBE_COMPRESS_MIN_SIZE', 500))
+
+# Запросы дольше порога попадают в лог с самыми долгими SQL
+SLOW_REQUEST_MS = int(os.environ.get('YATUBE_SLOW_REQUEST_MS', 500))
+SLOW_REQUEST_SAMPLE_RATE = float(
+    os.environ.get('YATUBE_SLOW_REQUEST_SAMPLE_RATE', 1.0)
+)
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ] 
@@ -72,22 +89,15 @@ ROOT_URLCONF = 'yatube.urls'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-                'core.context_processors.year.year',
-            ],
-        },
-    },
-]
+# YATUBE_TEMPLATE_PROFILE=production - кешируемый загрузчик шаблонов,
+# см. core/templates.py
+TEMPLATES = template_settings(BASE_DIR)
+# С явными loaders (профиль production) APP_DIRS выключен, но шаблоны
+# приложений, в том числе debug_toolbar, грузит app_directories
+# внутри кешируемого загрузчика: предупреждение W006 ложное
+SILENCED_SYSTEM_CHECKS = (
+    [] if TEMPLATES[0]['APP_DIRS'] else ['debug_toolbar.W006']
+)
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
@@ -102,6 +112,22 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения, см. core/routers.py. Локально их копирует
+# из основной базы команда replicate_sqlite
+DATABASES.update(replica_databases(BASE_DIR))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('YATUBE_REPLICA_PIN_SECONDS', 10))
+
+# Профиль production: прагмы из core/sqlite.py (WAL, mmap, busy_timeout)
+# и постоянные соединения вместо нового на каждый запрос
+SQLITE_PRODUCTION = os.environ.get('YATUBE_DB_PROFILE') == 'production'
+if SQLITE_PRODUCTION:
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = int(
+            os.environ.get('YATUBE_CONN_MAX_AGE', 600)
+        )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -150,13 +176,25 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.environ.get('YATUBE_STATIC_ROOT',
+                             os.path.join(BASE_DIR, 'staticfiles'))
+# YATUBE_STATIC_MANIFEST=1 - имена статики с хешем содержимого по
+# манифесту collectstatic; без собранной статики страницы не рендерятся
+if os.environ.get('YATUBE_STATIC_MANIFEST') == '1':
+    STATICFILES_STORAGE = 'core.static.CompressedManifestStaticFilesStorage'
+# Отдавать статику из Django (core/static.py), см. compress_static
+SERVE_STATIC = os.environ.get('YATUBE_SERVE_STATIC') == '1'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'KEY_PREFIX': 'index_page'
-    }
-}
+# Процессы пула, создающие миниатюры картинок постов.
+# 0 - миниатюра создаётся прямо в запросе
+THUMBNAIL_WORKERS = int(os.environ.get('YATUBE_THUMBNAIL_WORKERS', 2))
+
+# Потоки, в которых yatube/asgi.py выполняет view
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 8))
+
+# Кеш выбирается переменной окружения YATUBE_CACHE: locmem (по умолчанию),
+# file, sqlite (после manage.py createcachetable) или redis
+CACHES = cache_settings(BASE_DIR)
@@ -14,17 +14,31 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
 
+from core import static
+from core.views import metrics
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('metrics/', metrics, name='metrics'),
 ]
 
+# Статика с заранее сжатыми копиями, когда перед Django нет
+# веб-сервера. runserver при DEBUG отдаёт статику сам, пока
+# не запущен с --nostatic
+if settings.SERVE_STATIC:
+    urlpatterns += (
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'),
+                static.serve),
+    )
+
 if settings.DEBUG:
     import debug_toolbar
 